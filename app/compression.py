@@ -0,0 +1,219 @@
+"""Response compression.
+
+`CompressionMiddleware` picks an encoding from Accept-Encoding: zstd,
+brotli or gzip, preferred in that order when the client accepts several
+equally. Bodies below a minimum size, already-encoded responses and
+non-text content types pass through untouched. The level can be lowered or
+raised per path prefix, e.g. a cheaper level for large search pages.
+
+Compressed bodies of responses carrying an ETag are kept in an LRU keyed by
+(path, ETag, encoding, level). The ETag changes whenever the representation
+does, so a hot memo or list page served from the Redis cache is compressed
+once rather than on every hit.
+"""
+import zlib
+from collections import OrderedDict
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import brotli
+import zstandard
+
+from app.metrics import HTTP_COMPRESSED_RESPONSES, HTTP_COMPRESSION_BYTES
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+# Larger compressed bodies (unbounded search results) are not kept in the LRU
+MAX_CACHED_BODY = 1024 * 1024
+
+
+class _BrotliStream:
+    def __init__(self, level: int):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.finish()
+
+
+class Encoding(NamedTuple):
+    name: str
+    default_level: int
+    min_level: int
+    max_level: int
+    # level -> object with compress(data) and flush(), as zlib.compressobj
+    stream: Callable[[int], object]
+
+    def clamp(self, level: Optional[int]) -> int:
+        return self.default_level if level is None else min(self.max_level, max(self.min_level, level))
+
+    def compress(self, data: bytes, level: int) -> bytes:
+        stream = self.stream(level)
+        return stream.compress(data) + stream.flush()
+
+
+GZIP = Encoding("gzip", 6, 1, 9, lambda level: zlib.compressobj(level, zlib.DEFLATED, 31))
+BROTLI = Encoding("br", 4, 0, 11, _BrotliStream)
+ZSTD = Encoding("zstd", 3, 1, 19, lambda level: zstandard.ZstdCompressor(level=level).compressobj())
+
+
+# Server preference order: best ratio per CPU first
+ENCODINGS = [ZSTD, BROTLI, GZIP]
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Parse "gzip, br;q=0.8" into {coding: qvalue}"""
+    qvalues = {}
+    for item in filter(None, (part.strip() for part in header.split(","))):
+        coding, *params = (piece.strip() for piece in item.split(";"))
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qvalues[coding.lower()] = q
+    return qvalues
+
+
+def negotiate(header: str, encodings: List[Encoding]) -> Optional[Encoding]:
+    """Highest-q acceptable encoding, ties broken by server preference; None for identity"""
+    qvalues = parse_accept_encoding(header)
+    best, best_q = None, 0.0
+    for encoding in encodings:
+        q = qvalues.get(encoding.name, qvalues.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def parse_levels(spec: str) -> Dict[str, int]:
+    """Parse "/memos/search=4,/memos=6" into {path prefix: level}"""
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        prefix, _, level = item.rpartition("=")
+        levels[prefix.strip()] = int(level)
+    return levels
+
+
+def level_for(path: str, levels: Dict[str, int]) -> Optional[int]:
+    """Level of the longest configured prefix of `path`, None for the encoder default"""
+    matches = [prefix for prefix in levels if path.startswith(prefix)]
+    return levels[max(matches, key=len)] if matches else None
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware compressing response bodies
+
+    Whole bodies are compressed in one call (and cached when they carry an
+    ETag); streamed bodies such as NDJSON exports are compressed chunk by
+    chunk. ETags are passed through unchanged: they name the memo or list
+    version, which If-Match and If-None-Match compare against, and
+    `Vary: Accept-Encoding` keeps shared caches from mixing encodings.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, levels: Optional[Dict[str, int]] = None, cache_size: int = 256):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.levels = levels or {}
+        self.cache_size = cache_size
+        self.encodings = ENCODINGS
+        self._cache: "OrderedDict[Tuple[str, str, str, int], bytes]" = OrderedDict()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = next((value.decode("latin-1") for key, value in scope["headers"] if key == b"accept-encoding"), "")
+        encoding = negotiate(accept, self.encodings) if accept else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        level = encoding.clamp(level_for(scope["path"], self.levels))
+        start_message = None
+        stream = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, stream, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if stream is not None:
+                chunk = stream.compress(body)
+                if not more_body:
+                    chunk += stream.flush()
+                HTTP_COMPRESSION_BYTES.inc(len(body), encoding=encoding.name, stage="identity")
+                HTTP_COMPRESSION_BYTES.inc(len(chunk), encoding=encoding.name, stage="compressed")
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+                return
+
+            headers = start_message.get("headers", [])
+            if not self._compressible(headers) or (not more_body and len(body) < self.minimum_size):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            if more_body:
+                # Streaming response: length unknown, compress as chunks arrive
+                stream = encoding.stream(level)
+                HTTP_COMPRESSED_RESPONSES.inc(encoding=encoding.name, cache="stream")
+                await send({**start_message, "headers": self._encoded_headers(headers, encoding, None)})
+                await send_compressed(message)
+                return
+
+            compressed = self._compress(scope["path"], headers, body, encoding, level)
+            HTTP_COMPRESSION_BYTES.inc(len(body), encoding=encoding.name, stage="identity")
+            HTTP_COMPRESSION_BYTES.inc(len(compressed), encoding=encoding.name, stage="compressed")
+            await send({**start_message, "headers": self._encoded_headers(headers, encoding, len(compressed))})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
+
+    @staticmethod
+    def _compressible(headers) -> bool:
+        content_type = ""
+        for key, value in headers:
+            if key.lower() == b"content-encoding":
+                return False
+            if key.lower() == b"content-type":
+                content_type = value.decode("latin-1").lower()
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    @staticmethod
+    def _encoded_headers(headers, encoding: Encoding, length: Optional[int]):
+        vary = [value for key, value in headers if key.lower() == b"vary"]
+        encoded = [(key, value) for key, value in headers if key.lower() not in (b"content-length", b"vary")]
+        encoded.append((b"content-encoding", encoding.name.encode()))
+        encoded.append((b"vary", b", ".join([*vary, b"Accept-Encoding"])))
+        if length is not None:
+            encoded.append((b"content-length", str(length).encode()))
+        return encoded
+
+    def _compress(self, path: str, headers, body: bytes, encoding: Encoding, level: int) -> bytes:
+        etag = next((value.decode("latin-1") for key, value in headers if key.lower() == b"etag"), None)
+        if etag is None or self.cache_size <= 0 or len(body) > MAX_CACHED_BODY:
+            HTTP_COMPRESSED_RESPONSES.inc(encoding=encoding.name, cache="none")
+            return encoding.compress(body, level)
+        key = (path, etag, encoding.name, level)
+        compressed = self._cache.get(key)
+        if compressed is not None:
+            self._cache.move_to_end(key)
+            HTTP_COMPRESSED_RESPONSES.inc(encoding=encoding.name, cache="hit")
+            return compressed
+        compressed = encoding.compress(body, level)
+        self._cache[key] = compressed
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        HTTP_COMPRESSED_RESPONSES.inc(encoding=encoding.name, cache="miss")
+        return compressed
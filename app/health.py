@@ -0,0 +1,142 @@
+"""Background dependency probing for the health endpoints.
+
+`HealthMonitor` checks the database, Redis and Kafka on a fixed interval and
+keeps the latest result, so health requests (load balancer, k8s probes,
+monitoring) read a snapshot instead of each borrowing a pool connection.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import sqlalchemy
+from aiokafka import AIOKafkaProducer
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.services import utcnow
+
+logger = logging.getLogger(__name__)
+
+HEALTHY = "healthy"
+UNHEALTHY = "unhealthy"
+
+
+class HealthMonitor:
+    """Probes dependencies every `interval` seconds and caches the outcome
+
+    Only the database is required for readiness: without Redis the API
+    serves uncached reads, and without Kafka events wait in the outbox.
+    """
+
+    REQUIRED = ("database",)
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        redis_client,
+        kafka_producer: Optional[AIOKafkaProducer],
+        interval: float = 5.0,
+        timeout: float = 2.0
+    ):
+        self.session_factory = session_factory
+        self.redis_client = redis_client
+        self.kafka_producer = kafka_producer
+        self.interval = interval
+        self.timeout = timeout
+        self.snapshot: Optional[Dict[str, Any]] = None
+        self._checked_at_monotonic = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _check_database(self):
+        async with self.session_factory() as session:
+            await session.execute(sqlalchemy.text("SELECT 1"))
+
+    async def _check_redis(self):
+        if self.redis_client is None:
+            raise RuntimeError("Redis client not configured")
+        await self.redis_client.ping()
+
+    async def _check_kafka(self):
+        if self.kafka_producer is None:
+            raise RuntimeError("Kafka producer not configured")
+        client = self.kafka_producer.client
+        node_id = client.get_random_node()
+        if node_id is None or not await client.ready(node_id):
+            raise RuntimeError("No Kafka broker connection")
+
+    async def _probe(self, check: Callable[[], Awaitable[None]]) -> Dict[str, Any]:
+        start = time.perf_counter()
+        result: Dict[str, Any] = {"status": HEALTHY}
+        try:
+            await asyncio.wait_for(check(), self.timeout)
+        except Exception as e:
+            result = {"status": UNHEALTHY, "error": str(e) or type(e).__name__}
+        result["latency_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        result["checked_at"] = utcnow().isoformat() + "Z"
+        return result
+
+    async def probe_once(self) -> Dict[str, Any]:
+        """Run every check concurrently and store the result as the current snapshot"""
+        names = ("database", "redis", "kafka")
+        results = await asyncio.gather(
+            self._probe(self._check_database),
+            self._probe(self._check_redis),
+            self._probe(self._check_kafka),
+        )
+        checks = dict(zip(names, results))
+        # Log state changes only, not every failing round
+        previous = self.snapshot["checks"] if self.snapshot else {}
+        for name, check in checks.items():
+            if check["status"] == previous.get(name, {}).get("status", HEALTHY):
+                continue
+            if check["status"] == UNHEALTHY:
+                logger.error("%s health check failed: %s", name, check["error"])
+            else:
+                logger.info("%s health check recovered", name)
+        self.snapshot = {
+            "status": HEALTHY if all(check["status"] == HEALTHY for check in results) else "degraded",
+            "ready": all(checks[name]["status"] == HEALTHY for name in self.REQUIRED),
+            "checked_at": utcnow().isoformat() + "Z",
+            "checks": checks,
+        }
+        self._checked_at_monotonic = time.monotonic()
+        return self.snapshot
+
+    def age(self) -> Optional[float]:
+        """Seconds since the last probe, None before the first one"""
+        if self.snapshot is None:
+            return None
+        return time.monotonic() - self._checked_at_monotonic
+
+    def is_stale(self) -> bool:
+        """True when the probe loop has missed several rounds (e.g. it died or is stuck)"""
+        age = self.age()
+        return age is None or age > self.interval * 3 + self.timeout
+
+    async def current(self) -> Dict[str, Any]:
+        """The cached snapshot, probing inline only if none exists yet"""
+        if self.snapshot is None:
+            return await self.probe_once()
+        return self.snapshot
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await self.probe_once()
+            except Exception as e:
+                logger.error("Health probe failed: %s", e)
+            await asyncio.sleep(self.interval)
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
@@ -0,0 +1,132 @@
+"""In-process cache tier (L1) in front of Redis.
+
+`LocalCache` is a size-bounded LRU whose entries also expire after a short
+TTL. Each replica keeps its own copy of the hottest memos, so repeated reads
+skip the Redis round trip. Invalidations are broadcast over Redis pub/sub:
+the replica that invalidates a key publishes it, and every replica's
+`InvalidationListener` drops it from its L1. Messages can be lost while a
+listener reconnects, so it clears its whole L1 after every (re)subscribe,
+and the TTL bounds how long any missed invalidation can be served.
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+
+class LocalCache:
+    def __init__(self, max_entries: int = 1000, ttl: float = 10.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # Bumped by every discard/clear: a fill that started earlier may hold a stale value
+        self.invalidations = 0
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Store `value`; `ttl` can only shorten the tier's own TTL"""
+        lifetime = self.ttl if ttl is None else min(self.ttl, ttl)
+        self._entries[key] = (time.monotonic() + lifetime, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def discard(self, keys: Iterable[str]):
+        self.invalidations += 1
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        self.invalidations += 1
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "capacity": self.max_entries,
+        }
+
+
+def invalidation_message(origin: str, keys: Iterable[str]) -> str:
+    return json.dumps({"origin": origin, "keys": list(keys)})
+
+
+class InvalidationListener:
+    """Applies invalidations published by other replicas to this replica's L1"""
+
+    def __init__(self, redis_client, local_cache: Optional[LocalCache], origin: str, channel: str = INVALIDATION_CHANNEL, retry_interval: float = 1.0):
+        self.redis_client = redis_client
+        self.local_cache = local_cache
+        self.origin = origin
+        self.channel = channel
+        self.retry_interval = retry_interval
+        self.received = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self.redis_client and self.local_cache is not None and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def handle(self, data: str):
+        message = json.loads(data)
+        if message.get("origin") == self.origin:
+            return
+        self.received += 1
+        self.local_cache.discard(message.get("keys", []))
+
+    async def _run(self):
+        while True:
+            pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.channel)
+                # Anything published while we were not subscribed is lost
+                self.local_cache.clear()
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self.handle(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Cache invalidation listener error: %s", e)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+            self.local_cache.clear()
+            await asyncio.sleep(self.retry_interval)
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
@@ -0,0 +1,154 @@
+"""Structured, non-blocking logging.
+
+Records are put on an in-memory queue by a `QueueHandler` and formatted and
+written by a `QueueListener` thread, so a log call on the event loop never
+waits on stdout. Every record carries the request ID of the request that
+emitted it, and INFO/DEBUG records of high-volume routes can be sampled per
+request: a sampled-out request drops all of its low-level records, while
+WARNING and above are always kept.
+"""
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import sys
+import uuid
+from contextvars import ContextVar
+from typing import Dict, Optional, TextIO, Tuple
+
+from pythonjsonlogger import jsonlogger
+
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+# Whether INFO/DEBUG records of the current request are kept
+log_sampled_var: ContextVar[bool] = ContextVar("log_sampled", default=True)
+
+REQUEST_ID_HEADER = "x-request-id"
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+JSON_FORMAT = "%(asctime)s %(levelname)s %(name)s %(message)s %(request_id)s"
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s"
+
+# Loggers uvicorn configures with its own handlers; routed through ours instead
+UVICORN_LOGGERS = ("uvicorn", "uvicorn.error", "uvicorn.access")
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """Parse "/health=0,/memos/=0.1" into {path prefix: rate}"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        prefix, _, rate = item.rpartition("=")
+        rates[prefix.strip()] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+
+def sample_rate_for(path: str, rates: Dict[str, float]) -> float:
+    """Rate of the longest configured prefix of `path` (1.0 when none matches)"""
+    matches = [prefix for prefix in rates if path.startswith(prefix)]
+    return rates[max(matches, key=len)] if matches else 1.0
+
+
+class RequestContextFilter(logging.Filter):
+    """Adds `request_id` to records and drops low-level records of sampled-out requests
+
+    Attached to the queue handler, so it runs in the thread that logs and
+    sees that request's context variables.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return record.levelno >= logging.WARNING or log_sampled_var.get()
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge args and render the traceback here, keeping the structured
+        # fields (unlike the default, which flattens everything into msg)
+        record = logging.makeLogRecord(record.__dict__)
+        record.message = record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def build_formatter(fmt: str) -> logging.Formatter:
+    if fmt == "json":
+        return jsonlogger.JsonFormatter(
+            JSON_FORMAT,
+            rename_fields={"asctime": "timestamp", "levelname": "level", "name": "logger"},
+            # taskName is a LogRecord attribute since Python 3.12, unknown to this version
+            reserved_attrs=(*jsonlogger.RESERVED_ATTRS, "taskName"),
+            json_ensure_ascii=False
+        )
+    return logging.Formatter(TEXT_FORMAT)
+
+
+def build_queue_logging(fmt: str = "json", stream: Optional[TextIO] = None) -> Tuple[logging.Handler, logging.handlers.QueueListener]:
+    """Create the queue handler for loggers and the listener that writes the records"""
+    log_queue: queue.Queue = queue.Queue(-1)
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(RequestContextFilter())
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(build_formatter(fmt))
+    listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    return queue_handler, listener
+
+
+def setup_logging(level: str = "INFO", fmt: str = "json") -> logging.handlers.QueueListener:
+    """Route the root and uvicorn loggers through the queue; returns the started listener"""
+    queue_handler, listener = build_queue_logging(fmt)
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    for name in UVICORN_LOGGERS:
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+
+    listener.start()
+    return listener
+
+
+class RequestContextMiddleware:
+    """ASGI middleware assigning each request an ID and a log sampling decision
+
+    A well-formed incoming X-Request-ID is reused so IDs follow a request
+    across services; otherwise a new one is generated. The ID is returned in
+    the X-Request-ID response header.
+    """
+
+    def __init__(self, app, sample_rates: Optional[Dict[str, float]] = None):
+        self.app = app
+        self.sample_rates = sample_rates or {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = next(
+            (value.decode("latin-1") for key, value in scope["headers"] if key == REQUEST_ID_HEADER.encode()),
+            ""
+        )
+        request_id = incoming if _VALID_REQUEST_ID.match(incoming) else uuid.uuid4().hex
+        rate = sample_rate_for(scope["path"], self.sample_rates)
+        sampled = rate >= 1.0 or random.random() < rate
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (REQUEST_ID_HEADER.encode(), request_id.encode())]
+            await send(message)
+
+        request_token = request_id_var.set(request_id)
+        sampled_token = log_sampled_var.set(sampled)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(request_token)
+            log_sampled_var.reset(sampled_token)
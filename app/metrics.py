@@ -0,0 +1,256 @@
+"""Prometheus metrics for the memo API.
+
+A small in-process registry rendered in the Prometheus text exposition
+format (0.0.4). Observing a sample is a dict lookup plus a bisect, cheap
+enough to leave on for every request. Values that already live on service
+objects (pool size, cache hits, queue depth) are not duplicated here; the
+/metrics endpoint reads them at scrape time and passes them to `render()`.
+"""
+import bisect
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Dict[str, str]
+# (name, type, help, [(labels, value), ...]) for values read at scrape time
+MetricFamily = Tuple[str, str, str, List[Tuple[Labels, float]]]
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label(str(value))}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    value = float(value)
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _header(name: str, metric_type: str, documentation: str) -> List[str]:
+    return [f"# HELP {name} {documentation}", f"# TYPE {name} {metric_type}"]
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = tuple(str(labels[label]) for label in self.labelnames)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(str(labels[label]) for label in self.labelnames), 0.0)
+
+    def render(self) -> List[str]:
+        lines = _header(self.name, self.type, self.documentation)
+        for key, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(dict(zip(self.labelnames, key)))} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(str(labels[label]) for label in self.labelnames)
+        state = self._values.get(key)
+        if state is None:
+            state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        state[0][bisect.bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    @contextmanager
+    def time(self, **labels: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        state = self._values.get(tuple(str(labels[label]) for label in self.labelnames))
+        return state[2] if state else 0
+
+    def render(self) -> List[str]:
+        lines = _header(self.name, self.type, self.documentation)
+        for key, (counts, total, count) in self._values.items():
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float("inf")), counts):
+                cumulative += bucket_count
+                bucket_labels = _format_labels({**labels, "le": _format_value(bound)})
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), **kwargs) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self, families: Iterable[MetricFamily] = ()) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for name, metric_type, documentation, samples in families:
+            lines.extend(_header(name, metric_type, documentation))
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template and status code",
+    ("method", "route", "status")
+)
+DB_POOL_WAIT = REGISTRY.histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled database connection"
+)
+REDIS_COMMAND_DURATION = REGISTRY.histogram(
+    "redis_command_duration_seconds",
+    "Redis round-trip latency by cache operation",
+    ("operation",)
+)
+KAFKA_SEND_DURATION = REGISTRY.histogram(
+    "kafka_send_duration_seconds",
+    "Time from handing events to the producer until the broker acknowledged them",
+    ("source",)
+)
+SINGLE_FLIGHT_CALLS = REGISTRY.counter(
+    "single_flight_calls_total",
+    "Coalesced reads: leaders ran the load, followers joined one in flight",
+    ("group", "role")
+)
+CACHE_FILL_LOCK_WAITS = REGISTRY.counter(
+    "cache_fill_lock_waits_total",
+    "Reads that waited on another replica's cache fill, by how the wait ended",
+    ("outcome",)
+)
+PAGE_CACHE_LOOKUPS = REGISTRY.counter(
+    "page_cache_lookups_total",
+    "List and search page cache lookups by entry state (fresh, stale, miss)",
+    ("state",)
+)
+PAGE_CACHE_REFRESHES = REGISTRY.counter(
+    "page_cache_refreshes_total",
+    "Background refreshes of stale pages by outcome",
+    ("outcome",)
+)
+RATE_LIMITED_REQUESTS = REGISTRY.counter(
+    "http_rate_limited_requests_total",
+    "Requests rejected with 429 by the rule that ran out of tokens",
+    ("rule", "backend")
+)
+RATE_LIMIT_BACKEND_ERRORS = REGISTRY.counter(
+    "rate_limit_redis_errors_total",
+    "Rate limit checks that fell back to local buckets because Redis failed"
+)
+HTTP_COMPRESSED_RESPONSES = REGISTRY.counter(
+    "http_compressed_responses_total",
+    "Compressed responses by encoding and whether the compressed body came from the cache",
+    ("encoding", "cache")
+)
+HTTP_COMPRESSION_BYTES = REGISTRY.counter(
+    "http_compression_bytes_total",
+    "Response body bytes before (identity) and after compression",
+    ("encoding", "stage")
+)
+
+
+class TimedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """Connection pool that records how long each checkout waited for a connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT.observe(time.perf_counter() - start)
+
+
+# Methods labelled by name; any other method the client sends is labelled "other"
+HTTP_METHODS = frozenset({"GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS"})
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request by method, route template and status
+
+    The route template (e.g. `/memos/{memo_id}`) and the fixed method set
+    keep label cardinality bounded; requests that match no route share the
+    `unmatched` label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route: Optional[object] = scope.get("route")
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - start,
+                method=scope["method"] if scope["method"] in HTTP_METHODS else "other",
+                route=getattr(route, "path", "unmatched"),
+                status=str(status_code)
+            )
@@ -0,0 +1,102 @@
+"""Schema upgrades for databases created by an older release.
+
+`metadata.create_all` creates missing tables but never changes one that
+exists, so columns, indexes and data added since a table was first created
+are brought in here. Each step is recorded in `schema_migrations` and runs
+once. Its statements are also safe to repeat, so replicas starting at the
+same time may both run a step, and a step interrupted halfway is simply
+run again.
+
+The statements use MariaDB syntax (`IF NOT EXISTS` on ALTER TABLE,
+JSON_TABLE from 10.6). SQLite, used by the tests, always gets complete
+tables from `create_all` and needs no upgrades.
+"""
+import logging
+from typing import List, Tuple
+
+import sqlalchemy
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.search import FULLTEXT_INDEX_NAME
+
+logger = logging.getLogger(__name__)
+
+migration_metadata = sqlalchemy.MetaData()
+schema_migrations = sqlalchemy.Table(
+    "schema_migrations",
+    migration_metadata,
+    sqlalchemy.Column("name", sqlalchemy.String(100), primary_key=True),
+    sqlalchemy.Column("applied_at", sqlalchemy.DateTime, nullable=False, server_default=sqlalchemy.func.now()),
+)
+
+Step = Tuple[str, List[sqlalchemy.Executable]]
+
+
+def schema_steps(memos: sqlalchemy.Table, memo_tags: sqlalchemy.Table) -> List[Step]:
+    """Steps bringing existing tables up to `memos` and `memo_tags`, oldest first
+
+    Step names are recorded once applied: never rename or reorder a step,
+    add a new one instead.
+    """
+    tag_length = memo_tags.c.tag.type.length
+    return [
+        ("0001_memos_version", [
+            sqlalchemy.text(f"ALTER TABLE {memos.name} ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1"),
+        ]),
+        ("0002_memos_list_indexes", [
+            sqlalchemy.schema.CreateIndex(index, if_not_exists=True)
+            for index in sorted(memos.indexes, key=lambda index: index.name)
+        ]),
+        ("0003_memos_fulltext", [
+            sqlalchemy.text(
+                f"ALTER TABLE {memos.name} ADD FULLTEXT INDEX IF NOT EXISTS {FULLTEXT_INDEX_NAME} (title, content)"
+            ),
+        ]),
+        # Tags are stored casefolded; the case-insensitive default collation
+        # would let distinct spellings collide on the primary key
+        ("0004_memo_tags_binary_collation", [
+            sqlalchemy.text(
+                f"ALTER TABLE {memo_tags.name} MODIFY tag VARCHAR({tag_length}) "
+                "CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL"
+            ),
+        ]),
+        # Rows written before tags were normalized kept their spelling; memos
+        # tagged before memo_tags existed have no rows at all. LOWER() agrees
+        # with `normalize_tag`'s casefold() except for a few letters such as ß.
+        ("0005_memo_tags_backfill", [
+            sqlalchemy.text(
+                f"INSERT IGNORE INTO {memo_tags.name} (tag, memo_id) "
+                f"SELECT LOWER(tag), memo_id FROM {memo_tags.name} WHERE tag <> LOWER(tag)"
+            ),
+            sqlalchemy.text(f"DELETE FROM {memo_tags.name} WHERE tag <> LOWER(tag)"),
+            sqlalchemy.text(
+                f"INSERT IGNORE INTO {memo_tags.name} (tag, memo_id) "
+                "SELECT DISTINCT LOWER(TRIM(jt.tag)), m.id "
+                f"FROM {memos.name} AS m, "
+                f"JSON_TABLE(m.tags, '$[*]' COLUMNS (tag VARCHAR({tag_length}) PATH '$')) AS jt "
+                "WHERE TRIM(jt.tag) <> ''"
+            ),
+        ]),
+    ]
+
+
+async def upgrade_schema(conn: AsyncConnection, steps: List[Step]) -> List[str]:
+    """Run the steps not yet applied, in order; returns the names of those run"""
+    if conn.dialect.name not in ("mysql", "mariadb"):
+        return []
+    if not conn.dialect.is_mariadb:
+        logger.warning("Schema migrations need MariaDB, skipped on MySQL %s", conn.dialect.server_version_info)
+        return []
+
+    await conn.run_sync(migration_metadata.create_all)
+    applied = set((await conn.execute(sqlalchemy.select(schema_migrations.c.name))).scalars())
+    ran = []
+    for name, statements in steps:
+        if name in applied:
+            continue
+        for statement in statements:
+            await conn.execute(statement)
+        await conn.execute(schema_migrations.insert().prefix_with("IGNORE"), {"name": name})
+        logger.info("Schema migration applied: %s", name)
+        ran.append(name)
+    return ran
@@ -0,0 +1,124 @@
+"""Stale-while-revalidate cache for list and search pages.
+
+A rendered page is stored in Redis with the list version it was rendered
+at, until the hard TTL (the Redis expiry). Memo writes bump that version
+and leave the entries in place. An entry of the current version is served
+as is and never reloaded: nothing it shows has changed. An entry of an
+older version rendered within the soft TTL is still served, while one
+background task re-renders it; an older one is reloaded before answering,
+so a page is never more than the soft TTL behind the latest write.
+"""
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, NamedTuple, Optional, Set, Tuple
+
+from app.metrics import PAGE_CACHE_LOOKUPS, PAGE_CACHE_REFRESHES
+from app.services import RedisService
+from app.singleflight import fill_once
+
+logger = logging.getLogger(__name__)
+
+PAGE_KEY_PREFIX = "page"
+
+
+class Page(NamedTuple):
+    body: bytes
+    next_cursor: Optional[str]
+    # List version the page was rendered at (None: unknown, e.g. without Redis)
+    version: Optional[int] = None
+
+
+class PageCache:
+    """Serves pages fresh, stale-while-revalidating, or loads them on a miss"""
+
+    def __init__(self, cache: RedisService, soft_ttl: int, hard_ttl: int, counter: str, lock_lease: float = 0.5):
+        self.cache = cache
+        self.soft_ttl = soft_ttl
+        self.hard_ttl = hard_ttl
+        # Version counter bumped by every write the pages show
+        self.counter = counter
+        self.lock_lease = lock_lease
+        self._refreshing: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    @staticmethod
+    def key(digest: str) -> str:
+        return f"{PAGE_KEY_PREFIX}:{digest}"
+
+    async def read(self, key: str, version: int) -> Optional[Tuple[Page, bool]]:
+        """The cached page and whether it predates `version`; None if missing or too old to serve"""
+        entry = await self.cache.get_cache(key)
+        if entry is None:
+            return None
+        stale = entry.get("version", 0) < version
+        if stale and time.time() >= entry.get("stale_until", 0):
+            return None
+        return Page(entry["body"].encode(), entry["next_cursor"], entry["version"]), stale
+
+    async def store(self, key: str, version: int, page: Page) -> bool:
+        """Store a page rendered at `version`, unless a write has bumped the version since"""
+        entry = {
+            "version": version,
+            # Once the version moves on, the entry is served stale until then
+            "stale_until": time.time() + self.soft_ttl,
+            "next_cursor": page.next_cursor,
+            "body": page.body.decode(),
+        }
+        # No tag set: pages are superseded through the version counter, never deleted
+        return await self.cache.set_cache(key, entry, expire=self.hard_ttl, version=(self.counter, version))
+
+    async def get(self, key: str, version: Optional[int], load: Callable[[], Awaitable[Page]]) -> Page:
+        """The page under `key`; `version` is the current list version (None: no caching)"""
+        if version is None or self.hard_ttl <= 0 or not self.cache.redis_client:
+            return (await load())._replace(version=version)
+
+        cached = await self.read(key, version)
+        if cached is not None:
+            page, stale = cached
+            PAGE_CACHE_LOOKUPS.inc(state="stale" if stale else "fresh")
+            if stale:
+                self._schedule_refresh(key, version, load)
+            return page
+
+        PAGE_CACHE_LOOKUPS.inc(state="miss")
+
+        async def load_and_store() -> Page:
+            page = (await load())._replace(version=version)
+            await self.store(key, version, page)
+            return page
+
+        async def read_filled() -> Optional[Page]:
+            filled = await self.read(key, version)
+            return filled[0] if filled is not None and not filled[1] else None
+
+        return await fill_once(self.cache, key, self.lock_lease, read_filled, load_and_store)
+
+    def _schedule_refresh(self, key: str, version: int, load: Callable[[], Awaitable[Page]]):
+        # One refresh per page in this process; the Redis lock covers other replicas
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        task = asyncio.create_task(self._refresh(key, version, load))
+        self._tasks.add(task)
+        task.add_done_callback(lambda done: (self._tasks.discard(done), self._refreshing.discard(key)))
+
+    async def _refresh(self, key: str, version: int, load: Callable[[], Awaitable[Page]]):
+        token = await self.cache.try_lock(f"refresh:{key}", self.lock_lease)
+        if token is None:
+            PAGE_CACHE_REFRESHES.inc(outcome="skipped")
+            return
+        try:
+            await self.store(key, version, await load())
+            PAGE_CACHE_REFRESHES.inc(outcome="refreshed")
+        except Exception as e:
+            PAGE_CACHE_REFRESHES.inc(outcome="failed")
+            logger.error("Page refresh failed for %s: %s", key, e)
+        finally:
+            await self.cache.release_lock(f"refresh:{key}", token)
+
+    async def stop(self):
+        """Cancel refreshes still running at shutdown"""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
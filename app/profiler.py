@@ -0,0 +1,165 @@
+"""Per-statement query profiling through SQLAlchemy engine events.
+
+Every statement is timed between `before_cursor_execute` and
+`after_cursor_execute` and aggregated under a fingerprint: the SQL with
+literals replaced by `?` and IN/VALUES lists collapsed, so the same query
+with different parameters lands in one bucket. Statements slower than the
+threshold are logged with their fingerprint (never their parameters).
+"""
+import logging
+import math
+import re
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List
+
+import sqlalchemy
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.services import utcnow
+
+logger = logging.getLogger(__name__)
+
+OTHER_FINGERPRINT = "<other>"
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|%\(\w+\)s|:\w+|\?")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_VALUES_LIST = re.compile(r"\bVALUES\s*(\([^()]*\))(?:\s*,\s*\([^()]*\))+", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """Normalize a SQL statement so that queries differing only in values compare equal"""
+    normalized = _STRING_LITERAL.sub("?", statement)
+    normalized = _PLACEHOLDER.sub("?", normalized)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _IN_LIST.sub("IN (...)", normalized)
+    normalized = _VALUES_LIST.sub(r"VALUES \1, ...", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+def percentile(sorted_samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_samples:
+        return 0.0
+    rank = min(len(sorted_samples), max(1, math.ceil(fraction * len(sorted_samples)))) - 1
+    return sorted_samples[rank]
+
+
+class QueryStats:
+    __slots__ = ("count", "total", "max", "rows", "samples")
+
+    def __init__(self, sample_size: int):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        # Most recent durations, used for the percentiles
+        self.samples: Deque[float] = deque(maxlen=sample_size)
+
+    def record(self, elapsed: float, rows: int):
+        self.count += 1
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+        if rows > 0:
+            self.rows += rows
+        self.samples.append(elapsed)
+
+    def report(self, fingerprint: str) -> Dict[str, Any]:
+        samples = sorted(self.samples)
+        return {
+            "fingerprint": fingerprint,
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "mean_ms": round(self.total / self.count * 1000, 3),
+            "p50_ms": round(percentile(samples, 0.50) * 1000, 3),
+            "p99_ms": round(percentile(samples, 0.99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+            "rows": self.rows,
+        }
+
+
+class QueryProfiler:
+    """Aggregates statement timings by fingerprint for the engines it is attached to"""
+
+    SORT_KEYS = ("total_ms", "p99_ms", "p50_ms", "mean_ms", "max_ms", "count", "rows")
+
+    def __init__(self, slow_threshold_ms: float = 200.0, max_fingerprints: int = 500, sample_size: int = 1000):
+        self.slow_threshold = slow_threshold_ms / 1000
+        self.max_fingerprints = max_fingerprints
+        self.sample_size = sample_size
+        self.slow_queries = 0
+        self.started_at = utcnow()
+        self._stats: Dict[str, QueryStats] = {}
+        # Fingerprinting is a handful of regexes; cache it per distinct statement text
+        self._fingerprints: Dict[str, str] = {}
+
+    def attach(self, engine: AsyncEngine):
+        sync_engine = engine.sync_engine
+        sqlalchemy.event.listen(sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        sqlalchemy.event.listen(sync_engine, "after_cursor_execute", self._after_cursor_execute)
+        sqlalchemy.event.listen(sync_engine, "handle_error", self._handle_error)
+
+    def detach(self, engine: AsyncEngine):
+        sync_engine = engine.sync_engine
+        sqlalchemy.event.remove(sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        sqlalchemy.event.remove(sync_engine, "after_cursor_execute", self._after_cursor_execute)
+        sqlalchemy.event.remove(sync_engine, "handle_error", self._handle_error)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+        self.record(statement, elapsed, getattr(cursor, "rowcount", -1))
+
+    def _handle_error(self, exception_context):
+        # A failed statement never reaches after_cursor_execute; drop its start time
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start_time"):
+            conn.info["query_start_time"].pop()
+
+    def _fingerprint(self, statement: str) -> str:
+        key = self._fingerprints.get(statement)
+        if key is None:
+            key = fingerprint(statement)
+            if len(self._fingerprints) < self.max_fingerprints * 4:
+                self._fingerprints[statement] = key
+        return key
+
+    def record(self, statement: str, elapsed: float, rows: int = -1):
+        key = self._fingerprint(statement)
+        stats = self._stats.get(key)
+        if stats is None:
+            # Keep memory bounded if something generates unbounded distinct SQL
+            bucket = key if len(self._stats) < self.max_fingerprints else OTHER_FINGERPRINT
+            stats = self._stats.get(bucket)
+            if stats is None:
+                stats = self._stats[bucket] = QueryStats(self.sample_size)
+        stats.record(elapsed, rows)
+
+        if elapsed >= self.slow_threshold:
+            self.slow_queries += 1
+            logger.warning("느린 쿼리 (%.1fms): %.500s", elapsed * 1000, key)
+
+    def top(self, limit: int = 20, sort: str = "total_ms") -> List[Dict[str, Any]]:
+        reports = [stats.report(key) for key, stats in self._stats.items()]
+        reports.sort(key=lambda report: report[sort], reverse=True)
+        return reports[:limit]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "fingerprints": len(self._stats),
+            "statements": sum(stats.count for stats in self._stats.values()),
+            "slow_queries": self.slow_queries,
+            "slow_threshold_ms": self.slow_threshold * 1000,
+            "since": self.started_at.isoformat() + "Z",
+        }
+
+    def reset(self):
+        self._stats.clear()
+        self._fingerprints.clear()
+        self.slow_queries = 0
+        self.started_at = utcnow()
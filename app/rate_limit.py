@@ -0,0 +1,296 @@
+"""Token-bucket rate limiting shared by all replicas.
+
+Every request takes tokens from a client-wide bucket and, when its path
+matches a configured prefix, from that route's bucket for the same client.
+Both buckets live in Redis and are refilled and debited by one Lua script,
+so the check is atomic and costs a single round trip (EVALSHA). Without
+Redis, or while it fails, buckets are kept in process memory instead: the
+limits then hold per replica rather than across the deployment.
+
+Behind a proxy the client is the address the proxy appended to
+X-Forwarded-For, honoured only for connections from the trusted proxies. Requests arriving without that header from an internal
+network (the SvelteKit server rendering pages) are not limited: they are
+made on behalf of many visitors and would otherwise share one bucket.
+"""
+import ipaddress
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional, Sequence, Tuple, Union
+from urllib.parse import parse_qs
+
+from fastapi.responses import JSONResponse
+
+from app.metrics import RATE_LIMIT_BACKEND_ERRORS, RATE_LIMITED_REQUESTS, REDIS_COMMAND_DURATION
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_KEY_PREFIX = "ratelimit"
+
+Network = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+# KEYS: one hash per bucket. ARGV[1]: tokens requested, then rate and burst per key.
+# A request is admitted only if every bucket has enough tokens; a rejected
+# request still refills the buckets but takes nothing from them.
+TOKEN_BUCKET_LUA = """
+local cost = tonumber(ARGV[1])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local buckets = {}
+local retry_after = 0
+local limiting = 0
+for i, key in ipairs(KEYS) do
+  local rate = tonumber(ARGV[2 * i])
+  local burst = tonumber(ARGV[2 * i + 1])
+  local state = redis.call('HMGET', key, 'tokens', 'ts')
+  local tokens = tonumber(state[1]) or burst
+  local ts = tonumber(state[2]) or now
+  tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+  local need = math.min(cost, burst)
+  if tokens < need and (need - tokens) / rate > retry_after then
+    retry_after = (need - tokens) / rate
+    limiting = i
+  end
+  buckets[i] = {tokens, need, rate, burst}
+end
+local remaining = -1
+for i, key in ipairs(KEYS) do
+  local tokens, need, rate, burst = unpack(buckets[i])
+  if limiting == 0 then
+    tokens = tokens - need
+  end
+  if remaining < 0 or tokens < remaining then
+    remaining = tokens
+  end
+  redis.call('HSET', key, 'tokens', tostring(tokens), 'ts', tostring(now))
+  redis.call('EXPIRE', key, math.ceil(burst / rate) + 1)
+end
+return {limiting, tostring(retry_after), tostring(remaining)}
+"""
+
+
+class Rule(NamedTuple):
+    name: str
+    rate: float
+    burst: float
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    retry_after: float
+    remaining: float
+    # Name of the rule that rejected the request ("client" for the client-wide one)
+    rule: Optional[str] = None
+
+
+def parse_rule(spec: str) -> Tuple[float, float]:
+    """Parse "5/20" into (tokens per second, burst)"""
+    rate, _, burst = spec.partition("/")
+    return float(rate), float(burst or rate)
+
+
+def parse_rules(spec: str) -> List[Rule]:
+    """Parse "/memos/search=5/20,/memos=20/60" into per-prefix rules"""
+    rules = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        prefix, _, limit = item.rpartition("=")
+        rules.append(Rule(prefix.strip(), *parse_rule(limit)))
+    return rules
+
+
+def rule_for(path: str, rules: Sequence[Rule]) -> Optional[Rule]:
+    """Rule with the longest prefix of `path`, if any"""
+    matches = [rule for rule in rules if path.startswith(rule.name)]
+    return max(matches, key=lambda rule: len(rule.name)) if matches else None
+
+
+class LocalTokenBuckets:
+    """In-process token buckets with the same semantics as the Lua script"""
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def acquire(self, buckets: Sequence[Tuple[str, Rule]], cost: float) -> Tuple[int, float, float]:
+        now = time.monotonic()
+        states = []
+        retry_after, limiting = 0.0, 0
+        for index, (key, rule) in enumerate(buckets, start=1):
+            tokens, updated = self._buckets.get(key, (rule.burst, now))
+            tokens = min(rule.burst, tokens + max(0.0, now - updated) * rule.rate)
+            need = min(cost, rule.burst)
+            if tokens < need and (need - tokens) / rule.rate > retry_after:
+                retry_after, limiting = (need - tokens) / rule.rate, index
+            states.append((key, tokens, need))
+
+        remaining = -1.0
+        for key, tokens, need in states:
+            if limiting == 0:
+                tokens -= need
+            remaining = tokens if remaining < 0 else min(remaining, tokens)
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return limiting, retry_after, remaining
+
+
+class RateLimiter:
+    """Admits or rejects requests against the client-wide and per-route rules"""
+
+    def __init__(self, redis_client, default_rule: Rule, route_rules: Sequence[Rule] = ()):
+        self.redis_client = redis_client
+        self.default_rule = default_rule
+        self.route_rules = list(route_rules)
+        self.local = LocalTokenBuckets()
+        self._script = None
+        self._redis_failing = False
+
+    def buckets(self, client: str, path: str) -> List[Tuple[str, Rule]]:
+        buckets = [(f"{RATE_LIMIT_KEY_PREFIX}:{client}", self.default_rule)]
+        route_rule = rule_for(path, self.route_rules)
+        if route_rule is not None:
+            buckets.append((f"{RATE_LIMIT_KEY_PREFIX}:{client}:{route_rule.name}", route_rule))
+        return buckets
+
+    async def _acquire_redis(self, buckets: List[Tuple[str, Rule]], cost: float) -> Tuple[int, float, float]:
+        if self._script is None:
+            self._script = self.redis_client.register_script(TOKEN_BUCKET_LUA)
+        args: List[float] = [cost]
+        for _, rule in buckets:
+            args.extend((rule.rate, rule.burst))
+        with REDIS_COMMAND_DURATION.time(operation="rate_limit"):
+            limiting, retry_after, remaining = await self._script(keys=[key for key, _ in buckets], args=args)
+        return int(limiting), float(retry_after), float(remaining)
+
+    async def acquire(self, client: str, path: str, cost: float = 1.0) -> Decision:
+        buckets = self.buckets(client, path)
+        backend = "local"
+        result = None
+        if self.redis_client:
+            try:
+                result = await self._acquire_redis(buckets, cost)
+                backend = "redis"
+                if self._redis_failing:
+                    self._redis_failing = False
+                    logger.info("Rate limiter is using Redis again")
+            except Exception as e:
+                RATE_LIMIT_BACKEND_ERRORS.inc()
+                # Log the switch, not every request while Redis is down
+                if not self._redis_failing:
+                    self._redis_failing = True
+                    logger.error("Rate limiter Redis error, using local buckets: %s", e)
+        if result is None:
+            result = self.local.acquire(buckets, cost)
+
+        limiting, retry_after, remaining = result
+        if limiting == 0:
+            return Decision(True, 0.0, remaining)
+        rule = buckets[limiting - 1][1]
+        RATE_LIMITED_REQUESTS.inc(rule=rule.name, backend=backend)
+        return Decision(False, retry_after, remaining, rule.name)
+
+
+def peer_in(scope, networks: Sequence[Network]) -> bool:
+    """Whether the connecting peer's address is inside `networks`"""
+    client = scope.get("client")
+    if not networks or not client:
+        return False
+    try:
+        address = ipaddress.ip_address(client[0])
+    except ValueError:
+        return False
+    return any(address in network for network in networks)
+
+
+def client_address(scope, trusted_hops: int = 0, trusted_proxies: Sequence[Network] = ()) -> str:
+    """Client IP; taken from X-Forwarded-For only when the peer is one of `trusted_proxies`
+
+    Anyone reaching the app directly could otherwise pick a new address,
+    and so a fresh bucket, with every request.
+    """
+    if trusted_hops > 0 and peer_in(scope, trusted_proxies):
+        forwarded = b",".join(value for key, value in scope["headers"] if key == b"x-forwarded-for")
+        hops = [hop.strip() for hop in forwarded.decode("latin-1").split(",") if hop.strip()]
+        if hops:
+            # The last `trusted_hops` entries were appended by our own proxies
+            return hops[max(0, len(hops) - trusted_hops)]
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def parse_networks(spec: str) -> List[Network]:
+    """Parse "10.0.0.0/8,172.16.0.0/12" into networks"""
+    return [ipaddress.ip_network(item.strip(), strict=False) for item in spec.split(",") if item.strip()]
+
+
+def internal_caller(scope, networks: Sequence[Network]) -> bool:
+    """Whether the request comes straight from `networks`, not through a proxy"""
+    if any(key == b"x-forwarded-for" for key, _ in scope["headers"]):
+        return False
+    return peer_in(scope, networks)
+
+
+def request_cost(query_string: bytes, offset_step: int) -> float:
+    """Tokens a request takes: deep `skip` offsets scan more rows and cost more"""
+    if offset_step <= 0:
+        return 1.0
+    try:
+        skip = int(parse_qs(query_string.decode("latin-1")).get("skip", ["0"])[0])
+    except ValueError:
+        return 1.0
+    return 1.0 + max(0, skip) // offset_step
+
+
+class RateLimitMiddleware:
+    """ASGI middleware answering over-limit requests with 429 and Retry-After
+
+    The limiter is read from `app.state.rate_limiter`, set up at startup;
+    None disables limiting. Paths under `exempt` (health checks, metrics
+    scrapes) and internal callers from `internal_networks` are never limited.
+    """
+
+    def __init__(
+        self,
+        app,
+        exempt: Sequence[str] = (),
+        trusted_hops: int = 0,
+        offset_step: int = 0,
+        internal_networks: Sequence[Network] = (),
+        trusted_proxies: Sequence[Network] = ()
+    ):
+        self.app = app
+        self.exempt = tuple(exempt)
+        self.trusted_hops = trusted_hops
+        self.offset_step = offset_step
+        self.internal_networks = list(internal_networks)
+        self.trusted_proxies = list(trusted_proxies)
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["path"].startswith(self.exempt)
+            or internal_caller(scope, self.internal_networks)
+        ):
+            await self.app(scope, receive, send)
+            return
+        limiter: Optional[RateLimiter] = scope["app"].state.rate_limiter
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        decision = await limiter.acquire(
+            client_address(scope, self.trusted_hops, self.trusted_proxies),
+            scope["path"],
+            request_cost(scope["query_string"], self.offset_step)
+        )
+        if decision.allowed:
+            await self.app(scope, receive, send)
+            return
+        response = JSONResponse(
+            status_code=429,
+            content={"detail": "요청이 너무 많습니다. 잠시 후 다시 시도해 주세요."},
+            headers={"Retry-After": str(max(1, math.ceil(decision.retry_after)))}
+        )
+        await response(scope, receive, send)
@@ -0,0 +1,97 @@
+"""Full-text search over memo title and content.
+
+On MariaDB the memos table carries a FULLTEXT index on (title, content) and
+searches run `MATCH ... AGAINST` in boolean mode with prefix terms, so a
+Korean word still matches when a particle follows it ("검색" finds "검색을").
+Other dialects (SQLite in tests) fall back to the LIKE scan.
+"""
+import html
+import os
+import re
+from typing import List, Optional, Tuple
+
+import sqlalchemy
+from sqlalchemy.dialects.mysql import match
+
+# auto: FULLTEXT on MariaDB/MySQL, LIKE elsewhere | fulltext | like
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "auto")
+# Must equal the server's innodb_ft_min_token_size; shorter terms are not indexed
+FULLTEXT_MIN_TOKEN_SIZE = int(os.getenv("FULLTEXT_MIN_TOKEN_SIZE", "2"))
+# Characters of content shown around the first match in search hits
+SNIPPET_LENGTH = int(os.getenv("SEARCH_SNIPPET_LENGTH", "160"))
+
+FULLTEXT_INDEX_NAME = "ft_memos_title_content"
+FULLTEXT_DIALECTS = ("mysql", "mariadb")
+
+# Characters with a meaning in BOOLEAN MODE queries
+_BOOLEAN_OPERATORS = re.compile(r'[+\-<>()~*"@]+')
+
+
+def fulltext_ddl(table_name: str) -> sqlalchemy.DDL:
+    """FULLTEXT index DDL, only executed when the table is created on MariaDB/MySQL"""
+    return sqlalchemy.DDL(
+        f"ALTER TABLE {table_name} ADD FULLTEXT INDEX {FULLTEXT_INDEX_NAME} (title, content)"
+    ).execute_if(dialect=FULLTEXT_DIALECTS)
+
+
+def use_fulltext(dialect_name: str) -> bool:
+    if SEARCH_BACKEND == "like":
+        return False
+    if SEARCH_BACKEND == "fulltext":
+        return True
+    return dialect_name in FULLTEXT_DIALECTS
+
+
+def fulltext_terms(q: str) -> List[str]:
+    """Split a user query into plain words, dropping boolean-mode operators"""
+    return _BOOLEAN_OPERATORS.sub(" ", q).split()
+
+
+def search_criteria(
+    title: sqlalchemy.Column,
+    content: sqlalchemy.Column,
+    q: str,
+    dialect_name: str
+) -> Tuple[sqlalchemy.ColumnElement, Optional[sqlalchemy.ColumnElement]]:
+    """Return the WHERE clause for `q` and a relevance score (None for the LIKE path)"""
+    terms = fulltext_terms(q) if use_fulltext(dialect_name) else []
+    indexed = [term for term in terms if len(term) >= FULLTEXT_MIN_TOKEN_SIZE]
+    if not indexed:
+        pattern = f"%{q}%"
+        return sqlalchemy.or_(title.like(pattern), content.like(pattern)), None
+
+    score = match(title, content, against=" ".join(f"+{term}*" for term in indexed)).in_boolean_mode()
+    criteria = [score]
+    # Terms below the index's token size are still required, checked on the narrowed rows
+    for term in terms:
+        if len(term) < FULLTEXT_MIN_TOKEN_SIZE:
+            pattern = f"%{term}%"
+            criteria.append(sqlalchemy.or_(title.like(pattern), content.like(pattern)))
+    return sqlalchemy.and_(*criteria), score
+
+
+def highlight_snippet(text: str, q: str, length: int = SNIPPET_LENGTH) -> str:
+    """Cut a window of `text` around the first query match and wrap matches in <mark>
+
+    The text is HTML-escaped, so the result is safe to render as markup.
+    """
+    terms = fulltext_terms(q) or [q]
+    pattern = re.compile(
+        "|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True)),
+        re.IGNORECASE
+    )
+    first = pattern.search(text)
+    start = 0 if first is None else max(0, first.start() - length // 3)
+    end = min(len(text), start + length)
+    window = text[start:end]
+
+    parts = ["…"] if start > 0 else []
+    position = 0
+    for found in pattern.finditer(window):
+        parts.append(html.escape(window[position:found.start()]))
+        parts.append(f"<mark>{html.escape(found.group())}</mark>")
+        position = found.end()
+    parts.append(html.escape(window[position:]))
+    if end < len(text):
+        parts.append("…")
+    return "".join(parts)
@@ -0,0 +1,23 @@
+"""Fast JSON rendering of memo rows.
+
+Rows read from the `memos` table are already typed by SQLAlchemy, so list
+endpoints write them straight to bytes with orjson instead of validating
+every row into `MemoInDB` and running the standard JSON encoder. The output
+is byte-for-byte what the `MemoInDB` response model would render.
+"""
+from typing import Any, Iterable, Mapping, Sequence
+
+import orjson
+
+
+def rows_to_dicts(rows: Iterable[Mapping[str, Any]], fields: Sequence[str]) -> list:
+    """Project row mappings onto the response model's fields, keeping its key order"""
+    return [{field: row[field] for field in fields} for row in rows]
+
+
+def render_rows(rows: Iterable[Mapping[str, Any]], fields: Sequence[str]) -> bytes:
+    return orjson.dumps(rows_to_dicts(rows, fields))
+
+
+def render_ndjson(rows: Iterable[Mapping[str, Any]], fields: Sequence[str]) -> bytes:
+    return b"".join(orjson.dumps(item) + b"\n" for item in rows_to_dicts(rows, fields))
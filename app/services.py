@@ -1,17 +1,53 @@
 import redis.asyncio as redis
+import asyncio
 import json
 import os
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterable, Callable, Awaitable, Tuple
 from aiokafka import AIOKafkaProducer, AIOKafkaConsumer
-from datetime import datetime
+from datetime import datetime, timezone
 import logging
+import time
+import uuid
+from functools import partial
+import sqlalchemy
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.local_cache import INVALIDATION_CHANNEL, LocalCache, invalidation_message
+from app.metrics import KAFKA_SEND_DURATION, REDIS_COMMAND_DURATION
 
 logger = logging.getLogger(__name__)
 
+# KEYS[1]: entry, KEYS[2]: version counter, KEYS[3..]: tag sets.
+# ARGV: expected version, payload, TTL. Stores nothing once the counter moved on.
+SET_IF_VERSION_LUA = """
+if redis.call('GET', KEYS[2]) ~= ARGV[1] then
+  return 0
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+for i = 3, #KEYS do
+  redis.call('SADD', KEYS[i], KEYS[1])
+  redis.call('EXPIRE', KEYS[i], ARGV[3])
+end
+return 1
+"""
+
 class RedisService:
-    def __init__(self):
+    """Redis cache, optionally with an in-process tier (L1) for selected keys
+
+    Reads and writes passing `local=True` go through the L1 first. Tag
+    invalidations passing `local=True` drop keys from this replica's L1 and
+    publish them on the invalidation channel for the other replicas.
+    """
+
+    def __init__(self, redis_client: Optional[redis.Redis] = None, local_cache: Optional[LocalCache] = None):
         self.redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
-        self.redis_client: Optional[redis.Redis] = None
+        self.redis_client: Optional[redis.Redis] = redis_client
+        self.local_cache = local_cache
+        # Identifies this replica's invalidation messages
+        self.instance_id = uuid.uuid4().hex
+        self.hits = 0
+        self.misses = 0
+        self._set_if_version = None
 
     async def connect(self):
         self.redis_client = redis.from_url(self.redis_url)
@@ -22,33 +58,215 @@ class RedisService:
         if self.redis_client:
             await self.redis_client.close()
 
-    async def get_cache(self, key: str) -> Optional[Dict]:
+    async def get_cache(self, key: str, local: bool = False) -> Optional[Dict]:
         if not self.redis_client:
             return None
+        local_cache = self.local_cache if local else None
+        if local_cache is not None:
+            data = local_cache.get(key)
+            if data is not None:
+                return json.loads(data)
+            # An invalidation arriving while we wait on Redis may predate what Redis returns
+            invalidations = local_cache.invalidations
         try:
-            data = await self.redis_client.get(key)
-            return json.loads(data) if data else None
+            with REDIS_COMMAND_DURATION.time(operation="get"):
+                data = await self.redis_client.get(key)
         except Exception as e:
-            logger.error(f"Redis get error: {e}")
+            logger.error("Redis get error: %s", e)
+            self.misses += 1
             return None
+        if data is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if local_cache is not None and local_cache.invalidations == invalidations:
+            local_cache.set(key, data)
+        return json.loads(data)
+
+    @staticmethod
+    def tag_key(tag: str) -> str:
+        return f"tag:{tag}"
 
-    async def set_cache(self, key: str, data: Dict, expire: int = 300):
+    async def set_cache(
+        self,
+        key: str,
+        data: Dict,
+        expire: int = 300,
+        tags: Iterable[str] = (),
+        local: bool = False,
+        version: Optional[Tuple[str, int]] = None
+    ) -> bool:
+        """Store `data` under `key` and register the key in each tag's set
+
+        With `version` (counter name, value read before loading `data`) the
+        entry is only stored while that counter still has the value, checked
+        atomically in Redis: a write invalidating the entry meanwhile bumped
+        it, so `data` may predate the write. Returns whether it was stored.
+        """
         if not self.redis_client:
+            return False
+        payload = json.dumps(data, default=str)
+        invalidations = self.local_cache.invalidations if self.local_cache is not None else 0
+        try:
+            if version is not None:
+                if self._set_if_version is None:
+                    self._set_if_version = self.redis_client.register_script(SET_IF_VERSION_LUA)
+                name, value = version
+                with REDIS_COMMAND_DURATION.time(operation="set"):
+                    stored = await self._set_if_version(
+                        keys=[key, self.version_key(name), *map(self.tag_key, tags)],
+                        args=[value, payload, expire]
+                    )
+                if not int(stored):
+                    return False
+            else:
+                async with self.redis_client.pipeline(transaction=False) as pipe:
+                    pipe.setex(key, expire, payload)
+                    for tag in tags:
+                        pipe.sadd(self.tag_key(tag), key)
+                        pipe.expire(self.tag_key(tag), expire)
+                    with REDIS_COMMAND_DURATION.time(operation="set"):
+                        await pipe.execute()
+        except Exception as e:
+            logger.error("Redis set error: %s", e)
+            return False
+        # Skipped if anything was invalidated locally while Redis was written
+        if local and self.local_cache is not None and self.local_cache.invalidations == invalidations:
+            self.local_cache.set(key, payload, ttl=expire)
+        return True
+
+    def _unlink_and_broadcast(self, pipe, keys: Iterable[str], local_keys: Iterable[str] = ()):
+        """Queue the UNLINK and, with an L1, the invalidation message for `local_keys`
+
+        Only `local_keys` (entries read and written with `local=True`) can be
+        in any replica's L1, so only they are dropped here and published.
+        """
+        pipe.unlink(*keys)
+        local_keys = list(local_keys)
+        if self.local_cache is not None and local_keys:
+            self.local_cache.discard(local_keys)
+            pipe.publish(INVALIDATION_CHANNEL, invalidation_message(self.instance_id, local_keys))
+
+    @staticmethod
+    def version_key(name: str) -> str:
+        return f"version:{name}"
+
+    async def get_version(self, name: str, expire: Optional[int] = None) -> Optional[int]:
+        """Current value of a version counter, None without Redis
+
+        A missing counter (first use, flushed Redis) starts at the current
+        time in nanoseconds rather than 0, so values handed out before a flush
+        are never handed out again. For the same reason a counter may expire:
+        `expire` seconds after it was created it simply starts over.
+        """
+        if not self.redis_client:
+            return None
+        key = self.version_key(name)
+        try:
+            with REDIS_COMMAND_DURATION.time(operation="version"):
+                value = await self.redis_client.get(key)
+                if value is None:
+                    await self.redis_client.set(key, time.time_ns(), nx=True, ex=expire)
+                    value = await self.redis_client.get(key)
+        except Exception as e:
+            logger.error("Redis version error: %s", e)
+            return None
+        return int(value)
+
+    @staticmethod
+    def lock_key(name: str) -> str:
+        return f"lock:{name}"
+
+    async def try_lock(self, name: str, lease: float) -> Optional[str]:
+        """Take a short-lived lock; returns its token, or None if another holder has it
+
+        A Redis error counts as acquired: the lock only saves duplicate work.
+        """
+        token = uuid.uuid4().hex
+        try:
+            with REDIS_COMMAND_DURATION.time(operation="lock"):
+                acquired = await self.redis_client.set(self.lock_key(name), token, nx=True, px=max(1, int(lease * 1000)))
+        except Exception as e:
+            logger.error("Redis lock error: %s", e)
+            return token
+        return token if acquired else None
+
+    async def lock_held(self, name: str) -> bool:
+        try:
+            with REDIS_COMMAND_DURATION.time(operation="lock"):
+                return await self.redis_client.get(self.lock_key(name)) is not None
+        except Exception as e:
+            logger.error("Redis lock error: %s", e)
+            return False
+
+    async def release_lock(self, name: str, token: str):
+        """Delete the lock if it is still ours (it may have expired and been retaken)"""
+        try:
+            with REDIS_COMMAND_DURATION.time(operation="lock"):
+                if await self.redis_client.get(self.lock_key(name)) == token:
+                    await self.redis_client.unlink(self.lock_key(name))
+        except Exception as e:
+            logger.error("Redis lock error: %s", e)
+
+    async def invalidate_tags(
+        self, *tags: str, versions: Iterable[str] = (), version_ttl: Optional[int] = None, local: bool = False
+    ):
+        """Drop every entry registered under `tags` in two round trips (SMEMBERS, then UNLINK)
+
+        The version counters named in `versions` are bumped in the first round
+        trip; counters created by the bump expire after `version_ttl` seconds.
+        With `local`, the entries may be held in an L1 and are also dropped there.
+        """
+        versions = list(versions)
+        if not self.redis_client or not (tags or versions):
             return
+        tag_keys = [self.tag_key(tag) for tag in tags]
         try:
-            await self.redis_client.setex(key, expire, json.dumps(data, default=str))
+            with REDIS_COMMAND_DURATION.time(operation="invalidate"):
+                async with self.redis_client.pipeline(transaction=False) as pipe:
+                    for tag_key in tag_keys:
+                        pipe.smembers(tag_key)
+                    for name in versions:
+                        pipe.set(self.version_key(name), time.time_ns(), nx=True, ex=version_ttl)
+                        pipe.incr(self.version_key(name))
+                    members = (await pipe.execute())[:len(tag_keys)]
+                # Tags named after a single entry (memo:<id>) cover it even once its tag set expired
+                entries = set(tags).union(*members)
+                if not entries:
+                    return
+                async with self.redis_client.pipeline(transaction=False) as pipe:
+                    self._unlink_and_broadcast(pipe, entries.union(tag_keys), entries if local else ())
+                    await pipe.execute()
         except Exception as e:
-            logger.error(f"Redis set error: {e}")
+            logger.error("Redis invalidate error: %s", e)
+
+    def stats(self) -> Dict[str, Any]:
+        """Redis tier lookups, plus the L1 tier's under "local" when it is enabled"""
+        lookups = self.hits + self.misses
+        stats: Dict[str, Any] = {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+        if self.local_cache is not None:
+            stats["local"] = self.local_cache.stats()
+        return stats
 
-    async def delete_cache(self, pattern: str):
+    async def delete_cache(self, pattern: str, batch_size: int = 500):
+        """Delete keys matching an ad-hoc pattern with incremental SCAN (never KEYS)"""
         if not self.redis_client:
             return
         try:
-            keys = await self.redis_client.keys(pattern)
-            if keys:
-                await self.redis_client.delete(*keys)
+            batch = []
+            async for key in self.redis_client.scan_iter(match=pattern, count=batch_size):
+                batch.append(key)
+                if len(batch) >= batch_size:
+                    await self.redis_client.unlink(*batch)
+                    batch = []
+            if batch:
+                await self.redis_client.unlink(*batch)
         except Exception as e:
-            logger.error(f"Redis delete error: {e}")
+            logger.error("Redis delete error: %s", e)
 
 class KafkaService:
     def __init__(self):
@@ -73,9 +291,248 @@ class KafkaService:
             return
         try:
             await self.producer.send_and_wait(topic, message)
-            logger.info(f"Message sent to topic {topic}: {message}")
+            logger.info("Message sent to topic %s: %s", topic, message)
         except Exception as e:
-            logger.error(f"Failed to send message to Kafka: {e}")
+            logger.error("Failed to send message to Kafka: %s", e)
+
+class EventPublisher:
+    """Bounded in-process queue of Kafka events, drained by a background task
+
+    Request handlers call `publish()`, which never waits on the broker. The
+    drain task hands queued events to `producer.send()` in batches and lets
+    aiokafka's own batching (linger) deliver them.
+    """
+
+    def __init__(self, producer: Optional[AIOKafkaProducer], max_queue_size: int = 10000, batch_size: int = 500):
+        self.producer = producer
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self.batch_size = batch_size
+        self.enqueued = 0
+        self.published = 0
+        self.failed = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self.producer and self._task is None:
+            self._task = asyncio.create_task(self._drain())
+
+    def publish(self, topic: str, message: Dict[str, Any]) -> bool:
+        """Queue an event without blocking; returns False if it was dropped"""
+        if not self.producer:
+            return False
+        try:
+            self.queue.put_nowait((topic, message))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning("Event queue full, dropped message for topic %s", topic)
+            return False
+        self.enqueued += 1
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+        return True
+
+    async def _drain(self):
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            await self._send_batch(batch)
+
+    async def _send_batch(self, batch):
+        for topic, message in batch:
+            try:
+                delivery = await self.producer.send(topic, message)
+                delivery.add_done_callback(partial(self._on_delivery, time.perf_counter()))
+            except Exception as e:
+                self.failed += 1
+                logger.error("Failed to send message to Kafka: %s", e)
+            finally:
+                self.queue.task_done()
+
+    def _on_delivery(self, sent_at: float, delivery: asyncio.Future):
+        if delivery.cancelled() or delivery.exception() is not None:
+            self.failed += 1
+            logger.error("Kafka delivery failed: %s", None if delivery.cancelled() else delivery.exception())
+        else:
+            self.published += 1
+            KAFKA_SEND_DURATION.observe(time.perf_counter() - sent_at, source="queue")
+
+    async def stop(self, timeout: float = 10.0):
+        """Send everything still queued and wait for the broker to acknowledge it"""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+            await asyncio.wait_for(self.producer.flush(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Event queue flush timed out, %s messages not sent", self.queue.qsize())
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self.queue.qsize(),
+            "queue_capacity": self.queue.maxsize,
+            "max_queue_depth": self.max_depth,
+            "enqueued": self.enqueued,
+            "published": self.published,
+            "failed": self.failed,
+            "dropped": self.dropped,
+        }
+
+def utcnow() -> datetime:
+    """Naive UTC timestamp, comparable with DATETIME values written by the app"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+class OutboxRelay:
+    """Publishes rows of the transactional outbox table to Kafka
+
+    Handlers write events to the outbox in the same transaction as the memo
+    change. The relay reads the oldest rows in batches, publishes them, and
+    deletes them only once Kafka has acknowledged the whole batch, so events
+    are delivered at least once. Rows are claimed with FOR UPDATE SKIP LOCKED
+    so relays on several replicas never publish the same batch concurrently.
+
+    Without a producer (Kafka was unreachable at start-up) the relay keeps
+    calling `connect` every `connect_interval` seconds and hands the new
+    producer to `on_connect`; meanwhile it still reports the outbox lag.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        outbox: sqlalchemy.Table,
+        producer: Optional[AIOKafkaProducer],
+        batch_size: int = 500,
+        delete_chunk_size: int = 100,
+        poll_interval: float = 1.0,
+        connect: Optional[Callable[[], Awaitable[AIOKafkaProducer]]] = None,
+        on_connect: Optional[Callable[[AIOKafkaProducer], None]] = None,
+        connect_interval: float = 5.0
+    ):
+        self.session_factory = session_factory
+        self.outbox = outbox
+        self.producer = producer
+        self.batch_size = batch_size
+        self.delete_chunk_size = delete_chunk_size
+        self.poll_interval = poll_interval
+        self.connect = connect
+        self.on_connect = on_connect
+        self.connect_interval = connect_interval
+        self.relayed = 0
+        self.failed_batches = 0
+        self.lag_seconds = 0.0
+        self.last_relay_at: Optional[datetime] = None
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if (self.producer or self.connect) and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def notify(self):
+        """Wake the relay after a commit instead of waiting for the next poll"""
+        self._wakeup.set()
+
+    async def _connect(self):
+        """Retry `connect` until Kafka is reachable, reporting the lag while rows pile up"""
+        failing = False
+        while self.producer is None:
+            try:
+                producer = await self.connect()
+            except Exception as e:
+                # Log the outage once, not every attempt
+                if not failing:
+                    failing = True
+                    logger.error("Outbox relay cannot connect to Kafka, retrying: %s", e)
+                try:
+                    await self.measure_lag()
+                except Exception as lag_error:
+                    logger.error("Outbox lag measurement failed: %s", lag_error)
+                await asyncio.sleep(self.connect_interval)
+                continue
+            self.producer = producer
+            logger.info("Outbox relay connected to Kafka")
+            if self.on_connect is not None:
+                self.on_connect(producer)
+
+    async def _run(self):
+        await self._connect()
+        while True:
+            try:
+                relayed = await self.relay_once()
+            except Exception as e:
+                self.failed_batches += 1
+                logger.error("Outbox relay failed: %s", e)
+                relayed = 0
+            if relayed < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+    async def measure_lag(self) -> float:
+        """Age of the oldest outbox row, without relaying anything"""
+        async with self.session_factory() as session:
+            oldest = (await session.execute(sqlalchemy.select(sqlalchemy.func.min(self.outbox.c.created_at)))).scalar()
+        self.lag_seconds = max(0.0, (utcnow() - oldest).total_seconds()) if oldest is not None else 0.0
+        return self.lag_seconds
+
+    async def relay_once(self) -> int:
+        """Publish and delete one batch of outbox rows; returns the number relayed"""
+        outbox = self.outbox
+        async with self.session_factory() as session:
+            async with session.begin():
+                query = (
+                    outbox.select()
+                    .order_by(outbox.c.id)
+                    .limit(self.batch_size)
+                    .with_for_update(skip_locked=True)
+                )
+                rows = (await session.execute(query)).mappings().all()
+                if not rows:
+                    self.lag_seconds = 0.0
+                    return 0
+                self.lag_seconds = max(0.0, (utcnow() - rows[0]["created_at"]).total_seconds())
+
+                sent_at = time.perf_counter()
+                deliveries = [await self.producer.send(row["topic"], row["payload"]) for row in rows]
+                # Any failed delivery raises and rolls back: the rows stay for the next attempt
+                await asyncio.gather(*deliveries)
+                KAFKA_SEND_DURATION.observe(time.perf_counter() - sent_at, source="outbox")
+
+                ids = [row["id"] for row in rows]
+                for start in range(0, len(ids), self.delete_chunk_size):
+                    chunk = ids[start:start + self.delete_chunk_size]
+                    await session.execute(outbox.delete().where(outbox.c.id.in_(chunk)))
+
+        self.relayed += len(rows)
+        self.last_relay_at = utcnow()
+        return len(rows)
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "relayed": self.relayed,
+            "failed_batches": self.failed_batches,
+            "lag_seconds": round(self.lag_seconds, 3),
+            "last_relay_at": self.last_relay_at.isoformat() + "Z" if self.last_relay_at else None,
+        }
 
 redis_service = RedisService()
 kafka_service = KafkaService()
\ No newline at end of file
@@ -0,0 +1,101 @@
+"""Request coalescing for cache misses.
+
+`SingleFlight` makes concurrent identical reads in one process share a
+single database call: the first caller starts the load as a task, later
+callers with the same key await that task. `fill_once` extends this across
+replicas with a short Redis lock, so when a hot cache entry expires only
+one replica reloads it while the others wait for the refilled entry.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+from app.metrics import CACHE_FILL_LOCK_WAITS, SINGLE_FLIGHT_CALLS
+from app.services import RedisService
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with equal keys into one execution
+
+    Keys are tuples whose first item names a group ("memo", "list"), so
+    writers can `forget` a whole group. The load runs as its own task: a
+    caller that is cancelled (client disconnect) does not cancel it for
+    the others.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Tuple[Hashable, ...], asyncio.Task] = {}
+
+    async def do(self, key: Tuple[Hashable, ...], load: Callable[[], Awaitable[T]]) -> T:
+        task = self._calls.get(key)
+        if task is None:
+            SINGLE_FLIGHT_CALLS.inc(group=key[0], role="leader")
+            task = asyncio.ensure_future(load())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        else:
+            SINGLE_FLIGHT_CALLS.inc(group=key[0], role="follower")
+        return await asyncio.shield(task)
+
+    def _finished(self, key: Tuple[Hashable, ...], task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Retrieve the exception so a load whose callers all went away is not reported as unhandled
+        if not task.cancelled():
+            task.exception()
+
+    def forget(self, key: Tuple[Hashable, ...]):
+        """Let the next caller start a new load instead of joining one begun before a write"""
+        self._calls.pop(key, None)
+
+    def forget_group(self, group: Hashable):
+        for key in [key for key in self._calls if key[0] == group]:
+            del self._calls[key]
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+
+async def fill_once(
+    cache: RedisService,
+    key: str,
+    lease: float,
+    read: Callable[[], Awaitable[Optional[Any]]],
+    load: Callable[[], Awaitable[Any]],
+    poll_interval: float = 0.02
+) -> Any:
+    """Load a missing cache entry on one replica at a time
+
+    The replica holding `lock:<key>` runs `load` (which stores the entry).
+    The others poll `read` until the entry appears, and load it themselves
+    once the lock is released without an entry (e.g. a 404) or its lease
+    runs out, so a crashed holder delays them by at most `lease` seconds.
+    Without Redis, or with `lease` 0, `load` simply runs.
+    """
+    if not cache.redis_client or lease <= 0:
+        return await load()
+    token = await cache.try_lock(key, lease)
+    if token is not None:
+        try:
+            return await load()
+        finally:
+            await cache.release_lock(key, token)
+
+    deadline = time.monotonic() + lease
+    outcome = "timeout"
+    while time.monotonic() < deadline:
+        await asyncio.sleep(poll_interval)
+        value = await read()
+        if value is not None:
+            CACHE_FILL_LOCK_WAITS.inc(outcome="filled")
+            return value
+        if not await cache.lock_held(key):
+            outcome = "released"
+            break
+    CACHE_FILL_LOCK_WAITS.inc(outcome=outcome)
+    return await load()
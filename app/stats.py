@@ -0,0 +1,176 @@
+"""Memo statistics kept as Redis hash counters.
+
+One hash per dimension (`memo-stats:category`, `memo-stats:priority`, ...)
+maps each value to the number of memos having it. Write handlers apply the
+difference between a memo's old and new values after they commit, so
+reading the stats is a single pipelined round trip instead of a GROUP BY per
+dimension. Counters applied outside the database transaction can drift
+(a crash between commit and increment, a write racing a rebuild), so a
+periodic reconciliation rebuilds every hash from the table.
+"""
+import asyncio
+import logging
+import uuid
+from collections import Counter
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+
+import sqlalchemy
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.services import utcnow
+
+logger = logging.getLogger(__name__)
+
+STATS_DIMENSIONS = ("category", "priority", "is_archived", "is_favorite", "author")
+STATS_KEY_PREFIX = "memo-stats"
+STATS_META_KEY = f"{STATS_KEY_PREFIX}:meta"
+STATS_LOCK_KEY = f"{STATS_KEY_PREFIX}:rebuild-lock"
+
+# (old row, new row): None for the side that does not exist (create / delete)
+RowChange = Tuple[Optional[Mapping[str, Any]], Optional[Mapping[str, Any]]]
+
+
+def stats_key(dimension: str) -> str:
+    return f"{STATS_KEY_PREFIX}:{dimension}"
+
+
+def field_value(value: Any) -> str:
+    """Hash field for a column value; NULL becomes the empty string"""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def row_deltas(changes: Iterable[RowChange]) -> Tuple[Counter, int]:
+    """Net counter changes per (dimension, value) and for the total"""
+    deltas: Counter = Counter()
+    total = 0
+    for old, new in changes:
+        for row, sign in ((old, -1), (new, 1)):
+            if row is None:
+                continue
+            total += sign
+            for dimension in STATS_DIMENSIONS:
+                deltas[(dimension, field_value(row[dimension]))] += sign
+    return Counter({key: delta for key, delta in deltas.items() if delta}), total
+
+
+class MemoStatsCounters:
+    """Maintains and reads the per-dimension memo counters"""
+
+    def __init__(self, redis_client, session_factory: async_sessionmaker, table: sqlalchemy.Table, reconcile_interval: float = 600.0):
+        self.redis_client = redis_client
+        self.session_factory = session_factory
+        self.table = table
+        self.reconcile_interval = reconcile_interval
+        self._rebuild_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def apply(self, changes: Iterable[RowChange]):
+        """Apply the old -> new differences of committed writes"""
+        if not self.redis_client:
+            return
+        deltas, total = row_deltas(changes)
+        if not deltas and not total:
+            return
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for (dimension, value), delta in deltas.items():
+                    pipe.hincrby(stats_key(dimension), value, delta)
+                if total:
+                    pipe.hincrby(STATS_META_KEY, "total", total)
+                await pipe.execute()
+        except Exception as e:
+            logger.error("Memo stats update error: %s", e)
+
+    async def compute(self, session: AsyncSession) -> Dict[str, Any]:
+        """Count every dimension with GROUP BY over the table"""
+        table = self.table
+        stats: Dict[str, Any] = {
+            "total": (await session.execute(sqlalchemy.select(sqlalchemy.func.count()).select_from(table))).scalar_one()
+        }
+        for dimension in STATS_DIMENSIONS:
+            column = table.c[dimension]
+            rows = await session.execute(sqlalchemy.select(column, sqlalchemy.func.count()).group_by(column))
+            stats[dimension] = {field_value(value): count for value, count in rows}
+        return stats
+
+    async def rebuild(self) -> Dict[str, Any]:
+        """Recount from the table and atomically replace the hashes"""
+        async with self.session_factory() as session:
+            stats = await self.compute(session)
+        if not self.redis_client:
+            return stats
+        try:
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                pipe.delete(STATS_META_KEY, *(stats_key(dimension) for dimension in STATS_DIMENSIONS))
+                for dimension in STATS_DIMENSIONS:
+                    if stats[dimension]:
+                        pipe.hset(stats_key(dimension), mapping=stats[dimension])
+                pipe.hset(STATS_META_KEY, mapping={"total": stats["total"], "rebuilt_at": utcnow().isoformat() + "Z"})
+                await pipe.execute()
+        except Exception as e:
+            logger.error("Memo stats rebuild error: %s", e)
+        return stats
+
+    async def read(self) -> Optional[Dict[str, Any]]:
+        """Counters from Redis, or None if they were never built (or Redis failed)"""
+        if not self.redis_client:
+            return None
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.hgetall(STATS_META_KEY)
+                for dimension in STATS_DIMENSIONS:
+                    pipe.hgetall(stats_key(dimension))
+                meta, *hashes = await pipe.execute()
+        except Exception as e:
+            logger.error("Memo stats read error: %s", e)
+            return None
+        if "rebuilt_at" not in meta:
+            return None
+        stats: Dict[str, Any] = {"total": int(meta["total"])}
+        for dimension, counts in zip(STATS_DIMENSIONS, hashes):
+            stats[dimension] = {value: int(count) for value, count in counts.items() if int(count) > 0}
+        return stats
+
+    async def get(self) -> Tuple[Dict[str, Any], str]:
+        """Stats and where they came from ("redis" or "database")"""
+        stats = await self.read()
+        if stats is not None:
+            return stats, "redis"
+        if not self.redis_client:
+            async with self.session_factory() as session:
+                return await self.compute(session), "database"
+        # First read after a flush or deploy: build once, concurrent callers wait for it
+        async with self._rebuild_lock:
+            stats = await self.read()
+            if stats is None:
+                stats = await self.rebuild()
+        return stats, "redis"
+
+    def start(self):
+        if self.redis_client and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        owner = uuid.uuid4().hex
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            try:
+                # One replica per interval does the recount
+                if await self.redis_client.set(STATS_LOCK_KEY, owner, nx=True, ex=max(1, int(self.reconcile_interval))):
+                    await self.rebuild()
+            except Exception as e:
+                logger.error("Memo stats reconciliation failed: %s", e)
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
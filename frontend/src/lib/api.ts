@@ -16,6 +16,7 @@ export interface Memo {
     author: string | null;
     created_at: string;
     updated_at: string;
+    version: number;
 }
 
 export interface MemoCreate {
@@ -40,17 +41,52 @@ export interface MemoUpdate {
     author?: string | null;
 }
 
+export interface MemoFilters {
+    category?: string;
+    priority?: number;
+    is_archived?: boolean;
+    is_favorite?: boolean;
+    author?: string;
+    tag?: string[];
+    tag_mode?: 'all' | 'any';
+}
+
+export interface TagCount {
+    tag: string;
+    count: number;
+}
+
 /**
- * Fetch all memos
+ * Fetch all memos, optionally filtered on the server
  */
-export async function getMemos(skip: number = 0, limit: number = 100): Promise<Memo[]> {
-    const response = await fetch(`${API_BASE_URL}/memos/?skip=${skip}&limit=${limit}`);
+export async function getMemos(skip: number = 0, limit: number = 100, filters: MemoFilters = {}): Promise<Memo[]> {
+    const params = new URLSearchParams({ skip: String(skip), limit: String(limit) });
+    for (const [key, value] of Object.entries(filters)) {
+        if (Array.isArray(value)) {
+            value.forEach((item) => params.append(key, item));
+        } else if (value !== undefined) {
+            params.set(key, String(value));
+        }
+    }
+    const response = await fetch(`${API_BASE_URL}/memos/?${params}`);
     if (!response.ok) {
         throw new Error(`Failed to fetch memos: ${response.statusText}`);
     }
     return response.json();
 }
 
+/**
+ * Fetch tags with the number of memos carrying each
+ */
+export async function getTags(prefix?: string): Promise<TagCount[]> {
+    const query = prefix ? `?prefix=${encodeURIComponent(prefix)}` : '';
+    const response = await fetch(`${API_BASE_URL}/tags${query}`);
+    if (!response.ok) {
+        throw new Error(`Failed to fetch tags: ${response.statusText}`);
+    }
+    return response.json();
+}
+
 /**
  * Fetch a single memo by ID
  */
@@ -3,14 +3,180 @@ import pytest_asyncio
 import asyncio
 from httpx import AsyncClient, ASGITransport
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from app.main import app, get_db, metadata
-from typing import AsyncGenerator
+from app.main import MEMO_LIST_VERSION, app, get_db, metadata, memo_outbox, memos
+from app.services import RedisService, EventPublisher, OutboxRelay, SET_IF_VERSION_LUA
+from app.profiler import QueryProfiler
+from app.health import HealthMonitor
+from app.stats import MemoStatsCounters
+from app.page_cache import PageCache
+from app.singleflight import SingleFlight
+from typing import Any, AsyncGenerator, Dict, List, Optional, Set
+import fnmatch
 
 
 # Test database URL (using SQLite for testing)
 TEST_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
 
 
+class FakePipeline:
+    """Buffers commands and runs them against FakeRedis on execute()"""
+
+    def __init__(self, redis_client: "FakeRedis"):
+        self.redis_client = redis_client
+        self.commands = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self):
+        results = [await getattr(self.redis_client, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+        self.commands = []
+        return results
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+
+class FakePubSub:
+    def __init__(self, redis_client: "FakeRedis"):
+        self.redis_client = redis_client
+        self.messages: asyncio.Queue = asyncio.Queue()
+        self.channels: Set[str] = set()
+
+    async def subscribe(self, *channels: str):
+        self.channels.update(channels)
+        self.redis_client.subscribers.append(self)
+
+    async def listen(self):
+        while True:
+            yield await self.messages.get()
+
+    async def aclose(self):
+        if self in self.redis_client.subscribers:
+            self.redis_client.subscribers.remove(self)
+
+
+class FakeRedis:
+    """Minimal in-memory stand-in for the redis.asyncio client used by the app"""
+
+    def __init__(self):
+        self.store: Dict[str, Any] = {}
+        self.ttls: Dict[str, int] = {}
+        self.subscribers: List[FakePubSub] = []
+
+    def pipeline(self, transaction: bool = True) -> FakePipeline:
+        return FakePipeline(self)
+
+    async def ping(self):
+        return True
+
+    async def get(self, key: str) -> Optional[str]:
+        return self.store.get(key)
+
+    async def setex(self, key: str, expire: int, value: str):
+        self.store[key] = value
+        self.ttls[key] = expire
+        return True
+
+    async def expire(self, key: str, expire: int):
+        if key not in self.store:
+            return False
+        self.ttls[key] = expire
+        return True
+
+    async def sadd(self, key: str, *members: str) -> int:
+        members_set = self.store.setdefault(key, set())
+        added = len(set(members) - members_set)
+        members_set.update(members)
+        return added
+
+    async def smembers(self, key: str) -> Set[str]:
+        return set(self.store.get(key, set()))
+
+    async def delete(self, *keys: str) -> int:
+        removed = 0
+        for key in keys:
+            if self.store.pop(key, None) is not None:
+                removed += 1
+            self.ttls.pop(key, None)
+        return removed
+
+    async def unlink(self, *keys: str) -> int:
+        return await self.delete(*keys)
+
+    async def set(self, key: str, value: str, nx: bool = False, ex: Optional[int] = None, px: Optional[int] = None):
+        if nx and key in self.store:
+            return None
+        self.store[key] = str(value)
+        if ex is not None:
+            self.ttls[key] = ex
+        if px is not None:
+            self.ttls[key] = px / 1000
+        return True
+
+    async def incr(self, key: str) -> int:
+        self.store[key] = str(int(self.store.get(key, 0)) + 1)
+        return int(self.store[key])
+
+    async def hset(self, key: str, field: Optional[str] = None, value: Any = None, mapping: Optional[Dict[str, Any]] = None) -> int:
+        fields = self.store.setdefault(key, {})
+        updates = {**({field: value} if field is not None else {}), **(mapping or {})}
+        added = len(set(updates) - set(fields))
+        fields.update({name: str(item) for name, item in updates.items()})
+        return added
+
+    async def hincrby(self, key: str, field: str, amount: int = 1) -> int:
+        fields = self.store.setdefault(key, {})
+        fields[field] = str(int(fields.get(field, 0)) + amount)
+        return int(fields[field])
+
+    async def hgetall(self, key: str) -> Dict[str, str]:
+        return dict(self.store.get(key, {}))
+
+    def register_script(self, script: str):
+        """Python equivalents of the app's Lua scripts"""
+        if script != SET_IF_VERSION_LUA:
+            raise NotImplementedError(script)
+
+        async def set_if_version(keys: List[str], args: List[Any]) -> int:
+            key, version_key, *tag_keys = keys
+            expected, payload, expire = args
+            if self.store.get(version_key) != str(expected):
+                return 0
+            await self.setex(key, int(expire), payload)
+            for tag_key in tag_keys:
+                await self.sadd(tag_key, key)
+                await self.expire(tag_key, int(expire))
+            return 1
+        return set_if_version
+
+    def pubsub(self, **kwargs) -> FakePubSub:
+        return FakePubSub(self)
+
+    async def publish(self, channel: str, message: str) -> int:
+        receivers = [sub for sub in self.subscribers if channel in sub.channels]
+        for subscriber in receivers:
+            subscriber.messages.put_nowait({"type": "message", "channel": channel, "data": message})
+        return len(receivers)
+
+    async def scan_iter(self, match: str = "*", count: Optional[int] = None):
+        for key in list(self.store):
+            if fnmatch.fnmatchcase(key, match):
+                yield key
+
+    async def keys(self, pattern: str = "*"):
+        raise AssertionError("KEYS must not be used")
+
+    async def close(self):
+        pass
+
+
 @pytest.fixture(scope="session")
 def event_loop():
     """Create an event loop for the test session"""
@@ -80,7 +246,17 @@ async def client(test_engine, test_session_factory):
     app.state.db_engine = test_engine
     app.state.db_session_factory = test_session_factory
     app.state.redis = None  # Disable Redis for tests
+    app.state.cache = RedisService(None)
+    app.state.single_flight = SingleFlight()
+    app.state.page_cache = PageCache(app.state.cache, soft_ttl=5, hard_ttl=60, counter=MEMO_LIST_VERSION)
+    app.state.rate_limiter = None  # Rate limiting is tested with its own limiter
+    app.state.events = EventPublisher(None)
+    app.state.outbox_relay = OutboxRelay(test_session_factory, memo_outbox, None)
     app.state.kafka = None  # Disable Kafka for tests
+    app.state.health = HealthMonitor(test_session_factory, None, None)
+    app.state.memo_stats = MemoStatsCounters(None, test_session_factory, memos)
+    app.state.query_profiler = QueryProfiler()
+    app.state.query_profiler.attach(test_engine)
 
     async with AsyncClient(
         transport=ASGITransport(app=app),
@@ -90,3 +266,15 @@ async def client(test_engine, test_session_factory):
 
     # Clear overrides
     app.dependency_overrides.clear()
+    app.state.query_profiler.detach(test_engine)
+
+
+@pytest.fixture(scope="function")
+def fake_redis(client):
+    """Attach an in-memory Redis to the app for cache tests"""
+    redis_client = FakeRedis()
+    app.state.redis = redis_client
+    app.state.cache = RedisService(redis_client)
+    app.state.memo_stats.redis_client = redis_client
+    app.state.page_cache.cache = app.state.cache
+    return redis_client
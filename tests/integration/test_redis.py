@@ -154,3 +154,59 @@ async def test_redis_json_data():
 
     except Exception as e:
         pytest.fail(f"Failed to test Redis JSON data: {e}")
+
+
+@pytest.mark.asyncio
+async def test_redis_rate_limit_script():
+    """Test the token-bucket Lua script against a real Redis"""
+    from app.rate_limit import RateLimiter, Rule, parse_rules
+
+    try:
+        redis_client = aioredis.from_url("redis://localhost:6380", decode_responses=True)
+        keys = ["ratelimit:integration-test", "ratelimit:integration-test:/memos/search"]
+        await redis_client.delete(*keys)
+        limiter = RateLimiter(redis_client, Rule("client", 0.1, 3), parse_rules("/memos/search=0.1/1"))
+
+        assert (await limiter.acquire("integration-test", "/memos/search/")).allowed
+        decision = await limiter.acquire("integration-test", "/memos/search/")
+        assert not decision.allowed
+        assert decision.rule == "/memos/search"
+        assert 0 < decision.retry_after <= 10
+
+        # The rejected request left the client bucket untouched
+        assert (await limiter.acquire("integration-test", "/memos/")).remaining == pytest.approx(1, abs=0.1)
+        assert 0 < await redis_client.ttl(keys[0]) <= 31
+
+        await redis_client.delete(*keys)
+        await redis_client.close()
+
+    except Exception as e:
+        pytest.fail(f"Failed to test Redis rate limit script: {e}")
+
+
+@pytest.mark.asyncio
+async def test_redis_conditional_cache_fill():
+    """Test that set_cache with a version stores only while the counter is unchanged"""
+    from app.services import RedisService
+
+    try:
+        redis_client = aioredis.from_url("redis://localhost:6380", decode_responses=True)
+        keys = ["memo:integration-test", "version:memo:integration-test", "tag:memo:integration-test"]
+        await redis_client.delete(*keys)
+        cache = RedisService(redis_client)
+
+        generation = await cache.get_version("memo:integration-test", expire=60)
+        await cache.invalidate_tags("memo:integration-test", versions=["memo:integration-test"])
+        assert not await cache.set_cache("memo:integration-test", {"v": 1}, expire=60, version=("memo:integration-test", generation))
+        assert await redis_client.get(keys[0]) is None
+
+        generation = await cache.get_version("memo:integration-test")
+        assert await cache.set_cache("memo:integration-test", {"v": 2}, expire=60, tags=["memo:integration-test"], version=("memo:integration-test", generation))
+        assert await cache.get_cache("memo:integration-test") == {"v": 2}
+        assert await redis_client.smembers(keys[2]) == {keys[0]}
+
+        await redis_client.delete(*keys)
+        await redis_client.close()
+
+    except Exception as e:
+        pytest.fail(f"Failed to test conditional cache fill: {e}")
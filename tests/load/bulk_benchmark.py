@@ -0,0 +1,73 @@
+"""
+메모 일괄 생성(POST /memos/bulk)과 단건 생성(POST /memos/) 처리량 비교 스크립트
+
+실행 방법:
+    uv run python tests/load/bulk_benchmark.py
+"""
+
+import asyncio
+import time
+
+import httpx
+
+
+BASE_URL = "http://localhost:8000"
+BATCH_SIZES = [100, 1000, 5000]
+SINGLE_CONCURRENCY = 10
+
+
+def make_memos(count: int):
+    return [
+        {"title": f"Bulk Benchmark {i}", "content": f"Benchmark content {i}", "tags": ["benchmark"]}
+        for i in range(count)
+    ]
+
+
+async def measure_single(client: httpx.AsyncClient, items):
+    """단건 POST를 SINGLE_CONCURRENCY개씩 동시에 보내며 초당 생성 행 수 측정"""
+    semaphore = asyncio.Semaphore(SINGLE_CONCURRENCY)
+
+    async def create(item):
+        async with semaphore:
+            response = await client.post("/memos/", json=item)
+            return response.status_code == 201
+
+    start_time = time.perf_counter()
+    results = await asyncio.gather(*(create(item) for item in items))
+    elapsed = time.perf_counter() - start_time
+    return sum(results), elapsed
+
+
+async def measure_bulk(client: httpx.AsyncClient, items):
+    """한 번의 일괄 POST로 초당 생성 행 수 측정"""
+    start_time = time.perf_counter()
+    response = await client.post("/memos/bulk", json=items)
+    elapsed = time.perf_counter() - start_time
+    created = response.json()["created"] if response.status_code == 201 else 0
+    return created, elapsed
+
+
+async def main():
+    """벤치마크 실행"""
+    print("=" * 60)
+    print("일괄 생성 벤치마크 시작")
+    print("=" * 60)
+
+    async with httpx.AsyncClient(base_url=BASE_URL, timeout=120) as client:
+        for batch_size in BATCH_SIZES:
+            items = make_memos(batch_size)
+            single_created, single_elapsed = await measure_single(client, items)
+            bulk_created, bulk_elapsed = await measure_bulk(client, items)
+
+            print(f"\n메모 {batch_size}개")
+            print(f"  단건 POST: {single_created}건, {single_elapsed:.2f} s, {single_created / single_elapsed:.0f} rows/s")
+            print(f"  일괄 POST: {bulk_created}건, {bulk_elapsed:.2f} s, {bulk_created / bulk_elapsed:.0f} rows/s")
+
+    print()
+    print("=" * 60)
+    print("일괄 생성 벤치마크 완료")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
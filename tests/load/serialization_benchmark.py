@@ -0,0 +1,93 @@
+"""
+메모 목록 직렬화 마이크로벤치마크
+
+현재 response_model 경로(Pydantic 검증 + JSONResponse)와
+app.serialization의 직접 직렬화 경로를 100행 / 1000행 페이지에서 비교합니다.
+서버나 데이터베이스 없이 실행됩니다.
+
+실행 방법:
+    uv run python tests/load/serialization_benchmark.py
+"""
+
+import asyncio
+import statistics
+import time
+from datetime import datetime
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+
+from app import serialization
+from app.main import MEMO_FIELDS, app
+
+
+PAGE_SIZES = [100, 1000]
+ITERATIONS = 50
+CONTENT = "스터디 기록과 코드 리뷰 메모입니다. " * 60
+
+
+def make_rows(count: int):
+    now = datetime(2026, 10, 17, 12, 0, 0, 123456)
+    return [
+        {
+            "id": i, "title": f"메모 {i}", "content": CONTENT, "tags": ["study", "review"],
+            "priority": 2, "category": "study", "is_archived": False, "is_favorite": i % 2 == 0,
+            "author": "sgcc", "created_at": now, "updated_at": now,
+        }
+        for i in range(count)
+    ]
+
+
+def list_response_field():
+    for route in app.routes:
+        if isinstance(route, APIRoute) and route.path == "/memos/" and "GET" in route.methods:
+            return route.response_field
+    raise RuntimeError("GET /memos/ route not found")
+
+
+async def response_model_path(field, rows) -> bytes:
+    content = await serialize_response(field=field, response_content=rows, is_coroutine=True)
+    return JSONResponse(content).body
+
+
+def fast_path(rows) -> bytes:
+    return serialization.render_rows(rows, MEMO_FIELDS)
+
+
+async def measure(render, *args):
+    timings = []
+    for _ in range(ITERATIONS):
+        start_time = time.perf_counter()
+        result = render(*args)
+        if hasattr(result, "__await__"):
+            await result
+        timings.append((time.perf_counter() - start_time) * 1000)
+    return statistics.median(timings)
+
+
+async def main():
+    """벤치마크 실행"""
+    field = list_response_field()
+
+    print("=" * 60)
+    print("직렬화 벤치마크 시작")
+    print("=" * 60)
+
+    for page_size in PAGE_SIZES:
+        rows = make_rows(page_size)
+        assert await response_model_path(field, rows) == fast_path(rows)
+
+        baseline = await measure(response_model_path, field, rows)
+        fast = await measure(fast_path, rows)
+        print(f"\n{page_size}행 페이지 (중앙값)")
+        print(f"  response_model: {baseline:.2f} ms")
+        print(f"  fast path:      {fast:.2f} ms ({baseline / fast:.1f}x)")
+
+    print()
+    print("=" * 60)
+    print("직렬화 벤치마크 완료")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
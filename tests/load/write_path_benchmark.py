@@ -0,0 +1,111 @@
+"""
+메모 쓰기 경로(생성/수정/삭제) 지연 시간 및 SQL 문 수 측정 스크립트
+
+앱을 프로세스 안에서(ASGI) SQLite 파일 데이터베이스로 실행하고, 요청마다
+걸린 시간과 실행된 SQL 문 수를 측정합니다. Redis와 Kafka는 사용하지 않습니다.
+
+실행 방법:
+    uv run python tests/load/write_path_benchmark.py
+"""
+
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+import sqlalchemy
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.main import MEMO_LIST_VERSION, app, memo_outbox, memos, metadata
+from app.services import EventPublisher, OutboxRelay, RedisService
+from app.page_cache import PageCache
+from app.singleflight import SingleFlight
+from app.stats import MemoStatsCounters
+
+
+ITERATIONS = 200
+
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+
+
+async def measure(client: AsyncClient, counter: StatementCounter, send):
+    """send()를 ITERATIONS 회 호출하고 지연 시간(ms)과 요청당 SQL 문 수를 반환"""
+    timings = []
+    counter.count = 0
+    for i in range(ITERATIONS):
+        start_time = time.perf_counter()
+        response = await send(i)
+        timings.append((time.perf_counter() - start_time) * 1000)
+        assert response.status_code < 400, response.text
+    timings.sort()
+    return {
+        "median_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[int(len(timings) * 0.95) - 1], 3),
+        "statements": counter.count / ITERATIONS,
+    }
+
+
+async def main():
+    """벤치마크 실행"""
+    db_path = os.path.join(tempfile.mkdtemp(), "write_path.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(metadata.create_all)
+    session_factory = async_sessionmaker(autoflush=False, bind=engine, class_=AsyncSession)
+
+    app.state.db_engine = engine
+    app.state.db_session_factory = session_factory
+    app.state.redis = None
+    app.state.kafka = None
+    app.state.cache = RedisService(None)
+    app.state.single_flight = SingleFlight()
+    app.state.page_cache = PageCache(app.state.cache, soft_ttl=5, hard_ttl=60, counter=MEMO_LIST_VERSION)
+    app.state.rate_limiter = None
+    app.state.events = EventPublisher(None)
+    app.state.outbox_relay = OutboxRelay(session_factory, memo_outbox, None)
+    app.state.memo_stats = MemoStatsCounters(None, session_factory, memos)
+
+    counter = StatementCounter()
+    sqlalchemy.event.listen(engine.sync_engine, "before_cursor_execute", counter)
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        ids = []
+
+        async def create(i):
+            response = await client.post("/memos/", json={"title": f"Write {i}", "content": "Benchmark"})
+            ids.append(response.json()["id"])
+            return response
+
+        async def update(i):
+            return await client.put(f"/memos/{ids[i]}", json={"title": f"Updated {i}"})
+
+        async def delete(i):
+            return await client.delete(f"/memos/{ids[i]}")
+
+        results = [
+            ("POST /memos/", await measure(client, counter, create)),
+            ("PUT /memos/{id}", await measure(client, counter, update)),
+            ("DELETE /memos/{id}", await measure(client, counter, delete)),
+        ]
+
+    await engine.dispose()
+
+    print("=" * 60)
+    print(f"쓰기 경로 벤치마크 ({ITERATIONS}회, SQLite)")
+    print("=" * 60)
+    for name, result in results:
+        print(f"\n{name}")
+        print(f"  중앙값: {result['median_ms']} ms, p95: {result['p95_ms']} ms")
+        print(f"  요청당 SQL 문: {result['statements']:.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
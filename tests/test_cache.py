@@ -0,0 +1,201 @@
+import asyncio
+import json
+
+import pytest
+from httpx import AsyncClient
+
+from app.local_cache import LocalCache
+from app.main import app
+from app.services import RedisService
+
+
+@pytest.mark.asyncio
+async def test_read_memo_populates_cache(client: AsyncClient, fake_redis):
+    """Test that the first read stores the memo and the second one hits the cache"""
+    create_response = await client.post("/memos/", json={"title": "Cached", "content": "Cached content"})
+    memo_id = create_response.json()["id"]
+
+    first = await client.get(f"/memos/{memo_id}")
+    assert first.status_code == 200
+    assert f"memo:{memo_id}" in fake_redis.store
+    assert app.state.cache.misses == 1
+
+    second = await client.get(f"/memos/{memo_id}")
+    assert second.status_code == 200
+    assert second.json() == first.json()
+    assert app.state.cache.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_read_memo_served_from_cache(client: AsyncClient, fake_redis):
+    """Test that a cached memo is returned without going to the database"""
+    create_response = await client.post("/memos/", json={"title": "Original", "content": "Body"})
+    memo = create_response.json()
+
+    await client.get(f"/memos/{memo['id']}")
+    cached = json.loads(fake_redis.store[f"memo:{memo['id']}"])
+    cached["title"] = "From cache"
+    fake_redis.store[f"memo:{memo['id']}"] = json.dumps(cached)
+
+    response = await client.get(f"/memos/{memo['id']}")
+    assert response.json()["title"] == "From cache"
+
+
+@pytest.mark.asyncio
+async def test_update_memo_invalidates_cache(client: AsyncClient, fake_redis):
+    """Test that updating a memo drops its cache entry"""
+    create_response = await client.post("/memos/", json={"title": "Before", "content": "Body"})
+    memo_id = create_response.json()["id"]
+    await client.get(f"/memos/{memo_id}")
+
+    await client.put(f"/memos/{memo_id}", json={"title": "After"})
+    assert f"memo:{memo_id}" not in fake_redis.store
+
+    response = await client.get(f"/memos/{memo_id}")
+    assert response.json()["title"] == "After"
+
+
+@pytest.mark.asyncio
+async def test_fill_racing_an_update_does_not_store_old_row(client: AsyncClient, fake_redis, monkeypatch):
+    """Test that a read that loaded the row before an update cannot cache it afterwards"""
+    cache = RedisService(fake_redis, LocalCache())
+    monkeypatch.setattr(app.state, "cache", cache)
+    memo_id = (await client.post("/memos/", json={"title": "Race", "content": "v1"})).json()["id"]
+
+    selected, resume = asyncio.Event(), asyncio.Event()
+    set_cache = cache.set_cache
+
+    async def paused_set_cache(*args, **kwargs):
+        # The fill has read the row and is about to store it
+        selected.set()
+        await resume.wait()
+        return await set_cache(*args, **kwargs)
+
+    monkeypatch.setattr(cache, "set_cache", paused_set_cache)
+    read = asyncio.create_task(client.get(f"/memos/{memo_id}"))
+    await selected.wait()
+    assert (await client.put(f"/memos/{memo_id}", json={"content": "v2"})).status_code == 200
+    resume.set()
+    assert (await read).json()["content"] == "v1"
+
+    assert f"memo:{memo_id}" not in fake_redis.store
+    assert cache.local_cache.get(f"memo:{memo_id}") is None
+    monkeypatch.setattr(cache, "set_cache", set_cache)
+    assert (await client.get(f"/memos/{memo_id}")).json()["content"] == "v2"
+    assert json.loads(fake_redis.store[f"memo:{memo_id}"])["content"] == "v2"
+
+
+@pytest.mark.asyncio
+async def test_delete_memo_invalidates_cache(client: AsyncClient, fake_redis):
+    """Test that deleting a memo drops its cache entry"""
+    create_response = await client.post("/memos/", json={"title": "Doomed", "content": "Body"})
+    memo_id = create_response.json()["id"]
+    await client.get(f"/memos/{memo_id}")
+
+    await client.delete(f"/memos/{memo_id}")
+    assert f"memo:{memo_id}" not in fake_redis.store
+
+    response = await client.get(f"/memos/{memo_id}")
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_invalidate_tags_drops_registered_entries(fake_redis):
+    """Test that invalidating a tag removes its entries and the tag set"""
+    cache = RedisService(fake_redis)
+    await cache.set_cache("page:1", {"n": 1}, expire=30, tags=["memos:list"])
+    await cache.set_cache("page:2", {"n": 2}, expire=30, tags=["memos:list"])
+    await cache.set_cache("memo:1", {"n": 3}, expire=30, tags=["memo:1"])
+
+    await cache.invalidate_tags("memos:list")
+
+    assert set(fake_redis.store) == {"memo:1", "tag:memo:1"}
+    assert fake_redis.ttls["tag:memo:1"] == 30
+
+
+@pytest.mark.asyncio
+async def test_delete_cache_uses_scan(fake_redis):
+    """Test pattern deletes walk the keyspace with SCAN instead of KEYS"""
+    cache = RedisService(fake_redis)
+    for i in range(5):
+        await cache.set_cache(f"search:{i}", {"n": i})
+    await cache.set_cache("memo:1", {"n": 1})
+
+    await cache.delete_cache("search:*", batch_size=2)
+
+    assert set(fake_redis.store) == {"memo:1"}
+
+
+@pytest.mark.asyncio
+async def test_read_memo_ignores_outdated_cache_entry(client: AsyncClient, fake_redis):
+    """Test that entries missing fields of the current schema are refetched"""
+    create_response = await client.post("/memos/", json={"title": "Fresh", "content": "Body"})
+    memo = create_response.json()
+    outdated = {key: value for key, value in memo.items() if key != "version"}
+    fake_redis.store[f"memo:{memo['id']}"] = json.dumps(outdated)
+
+    response = await client.get(f"/memos/{memo['id']}")
+
+    assert response.status_code == 200
+    assert response.json()["version"] == 1
+    assert "version" in json.loads(fake_redis.store[f"memo:{memo['id']}"])
+
+
+@pytest.mark.asyncio
+async def test_conditional_get_memo(client: AsyncClient, fake_redis):
+    """Test If-None-Match on a memo, answered from the cache and from the version column"""
+    memo = (await client.post("/memos/", json={"title": "Cond", "content": "Body"})).json()
+    first = await client.get(f"/memos/{memo['id']}")
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "public, no-cache"
+
+    cached = await client.get(f"/memos/{memo['id']}", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+    assert cached.content == b""
+
+    fake_redis.store.clear()
+    uncached = await client.get(f"/memos/{memo['id']}", headers={"If-None-Match": f'"other", W/{etag}'})
+    assert uncached.status_code == 304
+
+    await client.put(f"/memos/{memo['id']}", json={"content": "v2"})
+    changed = await client.get(f"/memos/{memo['id']}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert (await client.get("/memos/999999", headers={"If-None-Match": etag})).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_conditional_get_list_uses_list_version(client: AsyncClient, fake_redis):
+    """Test that list pages revalidate against a version bumped by every memo write"""
+    await client.post("/memos/", json={"title": "One", "content": "Body"})
+    page = await client.get("/memos/", params={"limit": 10})
+    etag = page.headers["ETag"]
+    assert etag.startswith('"l')
+
+    assert (await client.get("/memos/", params={"limit": 10}, headers={"If-None-Match": etag})).status_code == 304
+    # Other query parameters are a different page
+    other = await client.get("/memos/", params={"limit": 5}, headers={"If-None-Match": etag})
+    assert other.status_code == 200
+
+    await client.post("/memos/", json={"title": "Two", "content": "Body"})
+    # The page is served stale, under its own version, while it is re-rendered
+    stale = await client.get("/memos/", params={"limit": 10}, headers={"If-None-Match": etag})
+    assert stale.status_code == 304 and stale.headers["ETag"] == etag
+    await asyncio.gather(*app.state.page_cache._tasks)
+    refreshed = await client.get("/memos/", params={"limit": 10}, headers={"If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert len(refreshed.json()) == 2
+    assert refreshed.headers["ETag"] != etag
+
+
+@pytest.mark.asyncio
+async def test_conditional_get_list_without_redis(client: AsyncClient):
+    """Test the body-digest ETag used when no list version is available"""
+    await client.post("/memos/", json={"title": "One", "content": "Body"})
+    etag = (await client.get("/memos/")).headers["ETag"]
+    assert etag.startswith('"b')
+    assert (await client.get("/memos/", headers={"If-None-Match": etag})).status_code == 304
+
+    await client.put("/memos/1", json={"title": "Changed"})
+    assert (await client.get("/memos/", headers={"If-None-Match": etag})).status_code == 200
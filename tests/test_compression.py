@@ -0,0 +1,122 @@
+import gzip
+import uuid
+
+import brotli
+import pytest
+import zstandard
+from httpx import AsyncClient
+
+from app.compression import BROTLI, ENCODINGS, GZIP, ZSTD, level_for, negotiate, parse_accept_encoding, parse_levels
+from app.metrics import HTTP_COMPRESSED_RESPONSES
+
+
+async def create_page(client: AsyncClient, count: int = 30):
+    # A unique title keeps pages of different tests from sharing an ETag
+    marker = uuid.uuid4().hex
+    await client.post("/memos/bulk", json=[
+        {"title": f"Memo {i} {marker}", "content": "반복되는 본문 " * 20} for i in range(count)
+    ])
+
+
+def test_negotiation_follows_qvalues():
+    """Test Accept-Encoding parsing, wildcards and q=0 exclusions"""
+    assert parse_accept_encoding("gzip, br;q=0.8, *;q=0") == {"gzip": 1.0, "br": 0.8, "*": 0.0}
+    assert negotiate("gzip;q=0.5", [GZIP]) is GZIP
+    assert negotiate("*", [GZIP]) is GZIP
+    assert negotiate("gzip;q=0, *", [GZIP]) is None
+    assert negotiate("identity", [GZIP]) is None
+
+
+def test_negotiation_prefers_zstd_then_brotli():
+    """Test server preference among equally acceptable encodings"""
+    assert negotiate("gzip, br, zstd", ENCODINGS) is ZSTD
+    assert negotiate("gzip, deflate, br", ENCODINGS) is BROTLI
+    assert negotiate("zstd;q=0.5, br", ENCODINGS) is BROTLI
+    assert negotiate("gzip", ENCODINGS) is GZIP
+
+
+def zstd_decompress(data: bytes) -> bytes:
+    # Streamed frames carry no content size, so one-shot decompress() cannot size its output
+    return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+
+DECODERS = [("br", brotli.decompress), ("zstd", zstd_decompress), ("gzip", gzip.decompress)]
+
+
+def test_levels_use_longest_prefix():
+    """Test COMPRESSION_LEVELS parsing and clamping to the encoder range"""
+    levels = parse_levels("/memos=6, /memos/search=1")
+    assert level_for("/memos/search", levels) == 1
+    assert level_for("/memos/1", levels) == 6
+    assert level_for("/tags", levels) is None
+    assert GZIP.clamp(None) == 6
+    assert GZIP.clamp(20) == 9
+
+
+@pytest.mark.asyncio
+async def test_large_list_is_gzipped(client: AsyncClient):
+    """Test that list pages above the threshold are compressed and small bodies are not"""
+    await create_page(client)
+
+    response = await client.get("/memos/", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert int(response.headers["Content-Length"]) < len(response.content)
+    assert len(response.json()) == 30
+
+    small = await client.get("/health/live", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in small.headers
+
+    identity = await client.get("/memos/", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in identity.headers
+    assert identity.json() == response.json()
+
+
+@pytest.mark.asyncio
+async def test_compressed_body_is_reused_per_etag(client: AsyncClient):
+    """Test that a page with an unchanged ETag is compressed only once"""
+    await create_page(client)
+    misses = HTTP_COMPRESSED_RESPONSES.value(encoding="gzip", cache="miss")
+    hits = HTTP_COMPRESSED_RESPONSES.value(encoding="gzip", cache="hit")
+
+    first = await client.get("/memos/", headers={"Accept-Encoding": "gzip"})
+    second = await client.get("/memos/", headers={"Accept-Encoding": "gzip"})
+
+    assert first.headers["ETag"] == second.headers["ETag"]
+    assert first.content == second.content
+    assert HTTP_COMPRESSED_RESPONSES.value(encoding="gzip", cache="miss") == misses + 1
+    assert HTTP_COMPRESSED_RESPONSES.value(encoding="gzip", cache="hit") == hits + 1
+
+
+@pytest.mark.asyncio
+async def test_ndjson_stream_is_compressed(client: AsyncClient):
+    """Test that streamed NDJSON is compressed chunk by chunk without a Content-Length"""
+    await create_page(client)
+
+    async with client.stream("GET", "/memos/", headers={"Accept": "application/x-ndjson", "Accept-Encoding": "gzip"}) as response:
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert "Content-Length" not in response.headers
+        raw = b"".join([chunk async for chunk in response.aiter_raw()])
+
+    assert len(gzip.decompress(raw).splitlines()) == 30
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("encoding, decompress", DECODERS)
+async def test_bodies_round_trip(client: AsyncClient, encoding, decompress):
+    """Test that whole and streamed bodies decode to the uncompressed response"""
+    await create_page(client)
+    identity = await client.get("/memos/", headers={"Accept-Encoding": "identity"})
+
+    async with client.stream("GET", "/memos/", headers={"Accept-Encoding": encoding}) as response:
+        assert response.headers["Content-Encoding"] == encoding
+        raw = b"".join([chunk async for chunk in response.aiter_raw()])
+    assert int(response.headers["Content-Length"]) == len(raw) < len(identity.content)
+    assert decompress(raw) == identity.content
+
+    ndjson = {"Accept": "application/x-ndjson"}
+    plain = await client.get("/memos/", headers={**ndjson, "Accept-Encoding": "identity"})
+    async with client.stream("GET", "/memos/", headers={**ndjson, "Accept-Encoding": encoding}) as response:
+        assert response.headers["Content-Encoding"] == encoding
+        raw = b"".join([chunk async for chunk in response.aiter_raw()])
+    assert decompress(raw) == plain.content
@@ -0,0 +1,174 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+from httpx import AsyncClient
+
+from app.main import app, memo_outbox
+from app.services import EventPublisher, OutboxRelay, utcnow
+
+
+class FakeProducer:
+    """Records sent messages and acknowledges them immediately"""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, topic, message):
+        self.sent.append((topic, message))
+        delivery = asyncio.get_running_loop().create_future()
+        delivery.set_result(None)
+        return delivery
+
+    async def flush(self):
+        pass
+
+
+class FailingProducer(FakeProducer):
+    """Accepts messages but never gets them acknowledged"""
+
+    async def send(self, topic, message):
+        delivery = asyncio.get_running_loop().create_future()
+        delivery.set_exception(ConnectionError("broker unavailable"))
+        return delivery
+
+
+async def outbox_rows(session_factory):
+    async with session_factory() as session:
+        return (await session.execute(memo_outbox.select().order_by(memo_outbox.c.id))).mappings().all()
+
+
+@pytest.mark.asyncio
+async def test_publisher_drains_queue_in_background():
+    """Test that queued events are sent by the drain task and flushed on stop"""
+    producer = FakeProducer()
+    publisher = EventPublisher(producer, batch_size=2)
+    publisher.start()
+
+    for i in range(5):
+        assert publisher.publish("memo-created", {"id": i})
+    await publisher.stop()
+
+    assert [message["id"] for _, message in producer.sent] == [0, 1, 2, 3, 4]
+    stats = publisher.stats()
+    assert stats["queue_depth"] == 0
+    assert stats["published"] == 5
+    assert stats["enqueued"] == 5
+
+
+@pytest.mark.asyncio
+async def test_publisher_drops_when_full():
+    """Test that a full queue drops events instead of blocking the caller"""
+    publisher = EventPublisher(FakeProducer(), max_queue_size=2)
+
+    results = [publisher.publish("memo-created", {"id": i}) for i in range(3)]
+
+    assert results == [True, True, False]
+    assert publisher.stats()["dropped"] == 1
+    assert publisher.stats()["max_queue_depth"] == 2
+
+
+@pytest.mark.asyncio
+async def test_write_endpoints_queue_events(client: AsyncClient, monkeypatch):
+    """Test that create, update and delete enqueue their events when the outbox is disabled"""
+    monkeypatch.setattr("app.main.EVENT_OUTBOX_ENABLED", False)
+    publisher = EventPublisher(FakeProducer())
+    app.state.events = publisher
+
+    memo_id = (await client.post("/memos/", json={"title": "Event", "content": "Body"})).json()["id"]
+    await client.put(f"/memos/{memo_id}", json={"title": "Event 2"})
+    await client.delete(f"/memos/{memo_id}")
+
+    queued = [publisher.queue.get_nowait() for _ in range(publisher.queue.qsize())]
+    assert [topic for topic, _ in queued] == ["memo-created", "memo-updated", "memo-deleted"]
+    assert all(message["id"] == memo_id for _, message in queued)
+
+
+@pytest.mark.asyncio
+async def test_write_endpoints_stage_outbox_rows(client: AsyncClient, test_session_factory):
+    """Test that create, update and delete write their events to the outbox"""
+    memo_id = (await client.post("/memos/", json={"title": "Outbox", "content": "Body"})).json()["id"]
+    await client.put(f"/memos/{memo_id}", json={"title": "Outbox 2"})
+    await client.delete(f"/memos/{memo_id}")
+    await client.post("/memos/bulk", json=[{"title": "A", "content": "a"}, {"title": "B", "content": "b"}])
+
+    rows = await outbox_rows(test_session_factory)
+    assert [row["topic"] for row in rows] == ["memo-created", "memo-updated", "memo-deleted", "memo-created", "memo-created"]
+    assert rows[0]["payload"] == {"id": memo_id, "title": "Outbox", "action": "created"}
+
+
+@pytest.mark.asyncio
+async def test_outbox_relay_publishes_and_deletes(client: AsyncClient, test_session_factory):
+    """Test that the relay publishes outbox rows in order and removes them"""
+    await client.post("/memos/bulk", json=[{"title": f"Memo {i}", "content": "Body"} for i in range(5)])
+    producer = FakeProducer()
+    relay = app.state.outbox_relay
+    relay.producer = producer
+    relay.batch_size = 3
+    relay.delete_chunk_size = 2
+
+    assert await relay.relay_once() == 3
+    assert await relay.relay_once() == 2
+    assert await relay.relay_once() == 0
+
+    assert [message["title"] for _, message in producer.sent] == [f"Memo {i}" for i in range(5)]
+    assert await outbox_rows(test_session_factory) == []
+    assert relay.stats()["relayed"] == 5
+    assert relay.stats()["lag_seconds"] == 0
+
+
+@pytest.mark.asyncio
+async def test_outbox_relay_keeps_rows_on_failure(client: AsyncClient, test_session_factory):
+    """Test that unacknowledged events stay in the outbox for the next attempt"""
+    await client.post("/memos/", json={"title": "Retry", "content": "Body"})
+    relay = app.state.outbox_relay
+    relay.producer = FailingProducer()
+
+    with pytest.raises(ConnectionError):
+        await relay.relay_once()
+
+    assert len(await outbox_rows(test_session_factory)) == 1
+
+
+@pytest.mark.asyncio
+async def test_outbox_relay_reconnects_and_reports_lag(test_session_factory):
+    """Test that a relay started without Kafka measures the lag and relays once connected"""
+    async with test_session_factory() as session:
+        async with session.begin():
+            await session.execute(memo_outbox.insert(), [
+                {"topic": "memo-created", "payload": {"id": 1}, "created_at": utcnow() - timedelta(seconds=30)},
+            ])
+    producer = FakeProducer()
+    attempts = []
+    connected = asyncio.Event()
+
+    async def connect():
+        attempts.append(relay.lag_seconds)
+        if len(attempts) < 3:
+            raise ConnectionError("broker unavailable")
+        return producer
+
+    relay = OutboxRelay(
+        test_session_factory,
+        memo_outbox,
+        None,
+        poll_interval=0.01,
+        connect=connect,
+        on_connect=lambda _: connected.set(),
+        connect_interval=0
+    )
+    relay.start()
+    try:
+        await asyncio.wait_for(connected.wait(), 1)
+        # The lag was measured while Kafka was unreachable, not left at 0
+        assert attempts[1] >= 30
+        for _ in range(100):
+            if producer.sent:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        await relay.stop()
+
+    assert relay.producer is producer
+    assert producer.sent == [("memo-created", {"id": 1})]
+    assert await outbox_rows(test_session_factory) == []
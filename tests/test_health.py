@@ -1,6 +1,8 @@
 import pytest
 from httpx import AsyncClient
 
+from app.main import app
+
 
 @pytest.mark.asyncio
 async def test_health_check(client: AsyncClient):
@@ -25,3 +27,64 @@ async def test_health_check(client: AsyncClient):
 
     # Overall status should be degraded because Redis and Kafka are down
     assert data["status"] in ["healthy", "degraded"]
+
+
+@pytest.mark.asyncio
+async def test_health_serves_cached_snapshot(client: AsyncClient):
+    """Test that /health probes once and then reuses the snapshot"""
+    monitor = app.state.health
+    first = await client.get("/health")
+    checked_at = monitor.snapshot["checked_at"]
+
+    second = await client.get("/health")
+    assert second.json()["timestamp"] == first.json()["timestamp"] == checked_at
+
+
+@pytest.mark.asyncio
+async def test_liveness_does_not_probe(client: AsyncClient):
+    """Test that /health/live answers without touching dependencies"""
+    response = await client.get("/health/live")
+    assert response.status_code == 200
+    assert response.json() == {"status": "alive"}
+    assert app.state.health.snapshot is None
+
+
+@pytest.mark.asyncio
+async def test_readiness_reports_checks(client: AsyncClient):
+    """Test that readiness needs only the database and reports probe details"""
+    response = await client.get("/health/ready")
+    assert response.status_code == 200
+
+    data = response.json()
+    assert data["status"] == "ready"
+    assert data["stale"] is False
+    assert data["checks"]["database"]["status"] == "healthy"
+    assert data["checks"]["database"]["latency_ms"] >= 0
+    assert "checked_at" in data["checks"]["database"]
+    # Redis and Kafka are optional; their absence degrades but does not block traffic
+    assert data["checks"]["redis"]["status"] == "unhealthy"
+    assert data["status"] == "ready"
+
+
+@pytest.mark.asyncio
+async def test_readiness_fails_when_database_down_or_snapshot_stale(client: AsyncClient, monkeypatch):
+    """Test that readiness returns 503 for a failed database probe or a stale snapshot"""
+    monitor = app.state.health
+
+    async def failing_check():
+        raise ConnectionError("database unreachable")
+
+    monkeypatch.setattr(monitor, "_check_database", failing_check)
+    await monitor.probe_once()
+    response = await client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["checks"]["database"]["error"] == "database unreachable"
+
+    monkeypatch.undo()
+    await monitor.probe_once()
+    assert (await client.get("/health/ready")).status_code == 200
+
+    monkeypatch.setattr(monitor, "_checked_at_monotonic", monitor._checked_at_monotonic - 3600)
+    response = await client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["stale"] is True
@@ -0,0 +1,95 @@
+import asyncio
+import json
+
+import pytest
+from httpx import AsyncClient
+
+from app.local_cache import InvalidationListener, LocalCache
+from app.main import app
+from app.services import RedisService
+
+
+def test_lru_eviction_ttl_and_stats(monkeypatch):
+    """Test capacity-bound LRU eviction, TTL expiry and per-tier stats"""
+    now = [100.0]
+    monkeypatch.setattr("app.local_cache.time.monotonic", lambda: now[0])
+    local = LocalCache(max_entries=2, ttl=10)
+
+    local.set("a", "1")
+    local.set("b", "2")
+    assert local.get("a") == "1"
+    local.set("c", "3")
+    assert local.get("b") is None
+    assert local.get("a") == "1"
+
+    local.set("short", "x", ttl=1)
+    now[0] += 2
+    assert local.get("short") is None
+    now[0] += 10
+    assert local.get("a") is None
+
+    assert local.stats() == {"hits": 2, "misses": 3, "hit_ratio": 0.4, "entries": 0, "capacity": 2}
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_invalidation_reaches_other_replicas(fake_redis):
+    """Test that an invalidation on one replica drops the key from another replica's L1"""
+    replica_a = RedisService(fake_redis, LocalCache())
+    replica_b = RedisService(fake_redis, LocalCache())
+    listener_b = InvalidationListener(fake_redis, replica_b.local_cache, replica_b.instance_id)
+    listener_b.start()
+    await settle()
+
+    await replica_a.set_cache("memo:1", {"title": "v1"}, tags=["memo:1"], local=True)
+    assert await replica_b.get_cache("memo:1", local=True) == {"title": "v1"}
+    # Served from B's L1 without asking Redis
+    fake_redis.store["memo:1"] = json.dumps({"title": "changed behind the cache"})
+    assert await replica_b.get_cache("memo:1", local=True) == {"title": "v1"}
+    assert replica_b.stats()["local"]["hits"] == 1
+
+    published = []
+    publish = fake_redis.publish
+
+    async def record(channel, message):
+        published.append(json.loads(message))
+        return await publish(channel, message)
+
+    fake_redis.publish = record
+    await replica_a.set_cache("memo:1", {"title": "v2"}, tags=["memo:1"], local=True)
+    await replica_a.invalidate_tags("memo:1", local=True)
+    await settle()
+
+    assert listener_b.received == 1
+    assert "memo:1" not in replica_a.local_cache._entries
+    assert await replica_b.get_cache("memo:1", local=True) is None
+    # Only entries that can be in an L1 are broadcast, never tag sets or Redis-only entries
+    assert [message["keys"] for message in published] == [["memo:1"]]
+    await replica_a.set_cache("page:1", {"n": 1}, tags=["pages"])
+    await replica_a.invalidate_tags("pages")
+    await settle()
+    assert listener_b.received == 1 and len(published) == 1
+    await listener_b.stop()
+
+
+@pytest.mark.asyncio
+async def test_memo_reads_use_the_local_tier(client: AsyncClient, fake_redis, monkeypatch):
+    """Test that repeated memo reads hit L1, updates drop it, and stats are reported per tier"""
+    monkeypatch.setattr(app.state, "cache", RedisService(fake_redis, LocalCache()))
+    memo = (await client.post("/memos/", json={"title": "Hot", "content": "v1"})).json()
+
+    for _ in range(3):
+        assert (await client.get(f"/memos/{memo['id']}")).json()["content"] == "v1"
+    await client.put(f"/memos/{memo['id']}", json={"content": "v2"})
+    assert (await client.get(f"/memos/{memo['id']}")).json()["content"] == "v2"
+
+    cache = (await client.get("/health")).json()["cache"]
+    # The first read filled both tiers; the next two never reached Redis
+    assert cache["local"]["hits"] == 2
+    assert cache["hits"] == 0
+    metrics = (await client.get("/metrics")).text
+    assert "local_cache_hits_total 2" in metrics
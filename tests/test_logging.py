@@ -0,0 +1,87 @@
+import io
+import json
+import logging
+
+import pytest
+from httpx import AsyncClient
+
+from app.log_config import (
+    build_queue_logging,
+    log_sampled_var,
+    parse_sample_rates,
+    request_id_var,
+    sample_rate_for,
+)
+
+
+@pytest.fixture
+def json_logger():
+    """A logger writing JSON through the queue listener into a buffer"""
+    stream = io.StringIO()
+    queue_handler, listener = build_queue_logging("json", stream)
+    logger = logging.getLogger("tests.json_logging")
+    logger.addHandler(queue_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    listener.start()
+
+    def read_records():
+        listener.stop()
+        return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+    yield logger, read_records
+    logger.removeHandler(queue_handler)
+
+
+def test_json_records_carry_request_id(json_logger):
+    """Test that records are JSON objects with the request ID and merged args"""
+    logger, read_records = json_logger
+    token = request_id_var.set("req-123")
+    try:
+        logger.info("메모(ID:%s) 조회", 42)
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.exception("실패")
+    finally:
+        request_id_var.reset(token)
+
+    info, error = read_records()
+    assert info["message"] == "메모(ID:42) 조회"
+    assert info["request_id"] == "req-123"
+    assert info["level"] == "INFO"
+    assert info["logger"] == "tests.json_logging"
+    assert "ValueError: boom" in error["exc_info"]
+
+
+def test_sampled_out_request_keeps_only_warnings(json_logger):
+    """Test that INFO records of a sampled-out request are dropped, warnings kept"""
+    logger, read_records = json_logger
+    token = log_sampled_var.set(False)
+    try:
+        logger.info("dropped")
+        logger.warning("kept")
+    finally:
+        log_sampled_var.reset(token)
+    logger.info("outside request")
+
+    assert [record["message"] for record in read_records()] == ["kept", "outside request"]
+
+
+def test_sample_rates_use_longest_prefix():
+    """Test parsing of LOG_SAMPLE_RATES and prefix matching"""
+    rates = parse_sample_rates("/health=0, /memos/=0.1, /memos/search/=0.5")
+    assert sample_rate_for("/health/ready", rates) == 0.0
+    assert sample_rate_for("/memos/search/hits", rates) == 0.5
+    assert sample_rate_for("/memos/1", rates) == 0.1
+    assert sample_rate_for("/admin/queries", rates) == 1.0
+
+
+@pytest.mark.asyncio
+async def test_request_id_header(client: AsyncClient):
+    """Test that a valid incoming request ID is echoed and a new one is generated otherwise"""
+    response = await client.get("/health", headers={"X-Request-ID": "trace-abc.1"})
+    assert response.headers["X-Request-ID"] == "trace-abc.1"
+
+    generated = await client.get("/health", headers={"X-Request-ID": "bad id\twith spaces"})
+    assert len(generated.headers["X-Request-ID"]) == 32
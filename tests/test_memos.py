@@ -1,6 +1,9 @@
+import json
 import pytest
 from httpx import AsyncClient
 
+from app.main import MEMO_LIST_MAX_LIMIT
+
 
 @pytest.mark.asyncio
 async def test_create_memo(client: AsyncClient):
@@ -121,6 +124,10 @@ async def test_get_memos_with_pagination(client: AsyncClient):
     data = response.json()
     assert len(data) == 5
 
+    # Pages are bounded: they are rendered in one body and kept in the page cache
+    response = await client.get(f"/memos/?limit={MEMO_LIST_MAX_LIMIT + 1}")
+    assert response.status_code == 422
+
 
 @pytest.mark.asyncio
 async def test_get_memo_by_id(client: AsyncClient):
@@ -317,3 +324,288 @@ async def test_search_memos_validation_error(client: AsyncClient):
     response = await client.get("/memos/search/?q=")
 
     assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_get_memos_with_cursor(client: AsyncClient):
+    """Test walking all memos with keyset cursors"""
+    for i in range(5):
+        await client.post("/memos/", json={"title": f"Memo {i}", "content": f"Content {i}"})
+
+    seen = []
+    response = await client.get("/memos/?limit=2")
+    while True:
+        assert response.status_code == 200
+        seen.extend(memo["id"] for memo in response.json())
+        next_cursor = response.headers.get("X-Next-Cursor")
+        if next_cursor is None:
+            break
+        response = await client.get(f"/memos/?limit=2&cursor={next_cursor}")
+
+    assert len(seen) == 5
+    assert seen == sorted(seen, reverse=True)
+
+
+@pytest.mark.asyncio
+async def test_get_memos_with_cursor_by_updated_at(client: AsyncClient):
+    """Test cursor pagination ordered by updated_at with ties broken by id"""
+    ids = []
+    for i in range(4):
+        response = await client.post("/memos/", json={"title": f"Memo {i}", "content": f"Content {i}"})
+        ids.append(response.json()["id"])
+
+    first_page = await client.get("/memos/?limit=3&sort=updated_at")
+    next_cursor = first_page.headers["X-Next-Cursor"]
+    second_page = await client.get(f"/memos/?limit=3&sort=updated_at&cursor={next_cursor}")
+
+    seen = [memo["id"] for memo in first_page.json() + second_page.json()]
+    assert sorted(seen) == sorted(ids)
+    assert "X-Next-Cursor" not in second_page.headers
+
+
+@pytest.mark.asyncio
+async def test_get_memos_invalid_cursor(client: AsyncClient):
+    """Test that malformed or mismatched cursors are rejected"""
+    response = await client.get("/memos/?cursor=not-a-cursor")
+    assert response.status_code == 400
+
+    await client.post("/memos/", json={"title": "Memo", "content": "Content"})
+    id_cursor = (await client.get("/memos/?limit=1")).headers["X-Next-Cursor"]
+    response = await client.get(f"/memos/?sort=updated_at&cursor={id_cursor}")
+    assert response.status_code == 400
+
+    response = await client.get(f"/memos/?skip=5&cursor={id_cursor}")
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_search_memos_paginated(client: AsyncClient):
+    """Test that search results are bounded by limit and paged with cursors"""
+    for i in range(5):
+        await client.post("/memos/", json={"title": f"Kafka note {i}", "content": "Streaming"})
+
+    response = await client.get("/memos/search/?q=Kafka&limit=3")
+    assert response.status_code == 200
+    first_page = response.json()
+    assert len(first_page) == 3
+
+    next_cursor = response.headers["X-Next-Cursor"]
+    response = await client.get(f"/memos/search/?q=Kafka&limit=3&cursor={next_cursor}")
+    second_page = response.json()
+    assert len(second_page) == 2
+    assert "X-Next-Cursor" not in response.headers
+
+    ids = [memo["id"] for memo in first_page + second_page]
+    assert len(set(ids)) == 5
+
+
+@pytest.mark.asyncio
+async def test_search_memos_limit_cap(client: AsyncClient):
+    """Test that search limit cannot exceed the hard cap"""
+    response = await client.get("/memos/search/?q=anything&limit=100000")
+
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_search_memo_hits(client: AsyncClient):
+    """Test compact search hits with highlighted snippets"""
+    await client.post("/memos/", json={"title": "Redis", "content": "Caching with <b>Redis</b> is fast"})
+    await client.post("/memos/", json={"title": "Docker", "content": "Containers"})
+
+    response = await client.get("/memos/search/hits?q=redis")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["next_cursor"] is None
+    assert len(data["items"]) == 1
+
+    hit = data["items"][0]
+    assert set(hit) == {"id", "title", "score", "snippet"}
+    assert hit["title"] == "Redis"
+    assert hit["snippet"] == "Caching with &lt;b&gt;<mark>Redis</mark>&lt;/b&gt; is fast"
+
+
+@pytest.mark.asyncio
+async def test_export_memos(client: AsyncClient):
+    """Test exporting all memos as NDJSON"""
+    for i in range(3):
+        await client.post("/memos/", json={"title": f"Export {i}", "content": f"Content {i}"})
+
+    response = await client.get("/memos/export")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [memo["title"] for memo in lines] == ["Export 0", "Export 1", "Export 2"]
+    assert "created_at" in lines[0]
+
+
+@pytest.mark.asyncio
+async def test_get_memos_ndjson(client: AsyncClient):
+    """Test streaming list and search pages when NDJSON is requested"""
+    for i in range(3):
+        await client.post("/memos/", json={"title": f"Stream {i}", "content": f"Content {i}"})
+    headers = {"Accept": "application/x-ndjson"}
+
+    response = await client.get("/memos/?limit=2", headers=headers)
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line)["title"] for line in response.text.splitlines()] == ["Stream 2", "Stream 1"]
+
+    response = await client.get("/memos/search/?q=Stream 0", headers=headers)
+    assert [json.loads(line)["title"] for line in response.text.splitlines()] == ["Stream 0"]
+
+
+@pytest.mark.asyncio
+async def test_create_memos_bulk(client: AsyncClient):
+    """Test creating many memos in one request"""
+    items = [{"title": f"Bulk {i}", "content": f"Content {i}", "tags": ["bulk"]} for i in range(50)]
+
+    response = await client.post("/memos/bulk", json=items)
+
+    assert response.status_code == 201
+    data = response.json()
+    assert data["created"] == 50
+    assert data["errors"] == []
+    assert len(data["ids"]) == 50
+
+    memo = (await client.get(f"/memos/{data['ids'][7]}")).json()
+    assert memo["title"] == "Bulk 7"
+    assert memo["tags"] == ["bulk"]
+
+
+@pytest.mark.asyncio
+async def test_create_memos_bulk_reports_item_errors(client: AsyncClient):
+    """Test that invalid items are reported by index while valid ones are created"""
+    items = [
+        {"title": "Valid", "content": "OK"},
+        {"title": "No content"},
+        "not an object",
+        {"title": "Bad priority", "content": "x", "priority": 9},
+    ]
+
+    response = await client.post("/memos/bulk", json=items)
+
+    assert response.status_code == 201
+    data = response.json()
+    assert data["created"] == 1
+    assert [error["index"] for error in data["errors"]] == [1, 2, 3]
+    assert data["errors"][0]["errors"][0]["loc"] == ["content"]
+
+
+@pytest.mark.asyncio
+async def test_create_memos_bulk_limits(client: AsyncClient):
+    """Test bulk requests with no valid items or too many items"""
+    response = await client.post("/memos/bulk", json=[{"title": "No content"}])
+    assert response.status_code == 422
+
+    response = await client.post("/memos/bulk", json=[{"title": "t", "content": "c"}] * 5001)
+    assert response.status_code == 413
+
+
+@pytest.mark.asyncio
+async def test_write_path_without_returning(client: AsyncClient, test_engine, monkeypatch):
+    """Test create/update/delete on dialects without RETURNING (e.g. MariaDB UPDATE)"""
+    monkeypatch.setattr(test_engine.dialect, "insert_returning", False)
+    monkeypatch.setattr(test_engine.dialect, "update_returning", False)
+    monkeypatch.setattr(test_engine.dialect, "delete_returning", False)
+
+    response = await client.post("/memos/", json={"title": "No returning", "content": "Body"})
+    assert response.status_code == 201
+    created = response.json()
+    assert created["priority"] == 2
+    assert created["created_at"] == created["updated_at"]
+
+    response = await client.put(f"/memos/{created['id']}", json={"priority": 4})
+    assert response.status_code == 200
+    assert response.json()["title"] == "No returning"
+    assert response.json()["priority"] == 4
+
+    response = await client.put("/memos/999999", json={"priority": 4})
+    assert response.status_code == 404
+
+    assert (await client.delete(f"/memos/{created['id']}")).status_code == 204
+    assert (await client.delete(f"/memos/{created['id']}")).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_update_memo_if_match(client: AsyncClient):
+    """Test optimistic concurrency with ETag and If-Match"""
+    create_response = await client.post("/memos/", json={"title": "Versioned", "content": "v1"})
+    memo = create_response.json()
+    assert memo["version"] == 1
+    etag = create_response.headers["ETag"]
+    assert (await client.get(f"/memos/{memo['id']}")).headers["ETag"] == etag
+
+    response = await client.put(f"/memos/{memo['id']}", json={"content": "v2"}, headers={"If-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["version"] == 2
+    new_etag = response.headers["ETag"]
+    assert new_etag != etag
+
+    # A second editor still holding the old ETag is rejected
+    response = await client.put(f"/memos/{memo['id']}", json={"content": "lost"}, headers={"If-Match": etag})
+    assert response.status_code == 412
+    assert (await client.get(f"/memos/{memo['id']}")).json()["content"] == "v2"
+
+    response = await client.put(f"/memos/{memo['id']}", json={"content": "v3"}, headers={"If-Match": "*"})
+    assert response.status_code == 200
+    assert response.json()["version"] == 3
+
+
+@pytest.mark.asyncio
+async def test_update_memo_if_match_not_found(client: AsyncClient):
+    """Test that a missing memo is still 404 with If-Match"""
+    response = await client.put("/memos/999999", json={"title": "x"}, headers={"If-Match": '"999999-1"'})
+
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_get_memos_filters(client: AsyncClient):
+    """Test server-side filtering combined with cursor pagination"""
+    await client.post("/memos/bulk", json=[
+        {"title": f"Memo {i}", "content": "Body", "category": "study" if i % 2 else "club",
+         "priority": 4 if i % 3 == 0 else 2, "is_archived": i >= 8, "is_favorite": i % 4 == 0,
+         "author": "kim" if i < 5 else "lee"}
+        for i in range(10)
+    ])
+
+    response = await client.get("/memos/", params={"category": "study", "is_archived": "false"})
+    assert [memo["title"] for memo in response.json()] == ["Memo 7", "Memo 5", "Memo 3", "Memo 1"]
+
+    response = await client.get("/memos/", params={"author": "kim", "priority": 4})
+    assert [memo["title"] for memo in response.json()] == ["Memo 3", "Memo 0"]
+
+    response = await client.get("/memos/", params={"is_favorite": "true", "limit": 2})
+    assert [memo["title"] for memo in response.json()] == ["Memo 8", "Memo 4"]
+    cursor = response.headers["X-Next-Cursor"]
+    response = await client.get("/memos/", params={"is_favorite": "true", "limit": 2, "cursor": cursor})
+    assert [memo["title"] for memo in response.json()] == ["Memo 0"]
+
+    assert (await client.get("/memos/", params={"priority": 7})).status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_get_memos_filters_use_indexes(test_engine):
+    """Test that each filter is answered from its (column, id) index without a sort step"""
+    from app.main import build_list_query, memo_filters
+
+    cases = {
+        "ix_memos_category_id": {"category": "study"},
+        "ix_memos_priority_id": {"priority": 3},
+        "ix_memos_is_archived_id": {"is_archived": False},
+        "ix_memos_is_favorite_id": {"is_favorite": True},
+        "ix_memos_author_id": {"author": "kim"},
+    }
+    async with test_engine.connect() as conn:
+        for index_name, params in cases.items():
+            filters = memo_filters(**{
+                "category": None, "priority": None, "is_archived": None, "is_favorite": None, "author": None,
+                "tag": None, "tag_mode": "all", **params
+            })
+            query = build_list_query(filters, "id", {"id": 100}).limit(20)
+            sql = str(query.compile(test_engine.sync_engine, compile_kwargs={"literal_binds": True}))
+            plan = " ".join(row[-1] for row in await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"))
+            assert f"USING INDEX {index_name}" in plan or f"USING COVERING INDEX {index_name}" in plan, plan
+            assert "TEMP B-TREE" not in plan, plan
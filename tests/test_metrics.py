@@ -0,0 +1,99 @@
+import pytest
+import sqlalchemy
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.main import app
+from app.metrics import DB_POOL_WAIT, HTTP_REQUEST_DURATION, Histogram, TimedAsyncAdaptedQueuePool
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Test that buckets are cumulative and end with +Inf, sum and count"""
+    histogram = Histogram("demo_seconds", "Demo", ("route",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, route="/a")
+    histogram.observe(0.5, route="/a")
+    histogram.observe(3, route="/a")
+
+    lines = histogram.render()
+    assert 'demo_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{route="/a",le="1"} 2' in lines
+    assert 'demo_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'demo_seconds_sum{route="/a"} 3.55' in lines
+    assert 'demo_seconds_count{route="/a"} 3' in lines
+
+
+@pytest.mark.asyncio
+async def test_metrics_records_route_template(client: AsyncClient):
+    """Test that request latency is labelled by route template, not the raw path"""
+    create_response = await client.post("/memos/", json={"title": "Metric", "content": "Body"})
+    memo_id = create_response.json()["id"]
+    before = HTTP_REQUEST_DURATION.count(method="GET", route="/memos/{memo_id}", status="200")
+
+    await client.get(f"/memos/{memo_id}")
+    await client.get("/no-such-route")
+    await client.request("FOOBAR", f"/memos/{memo_id}")
+
+    assert HTTP_REQUEST_DURATION.count(method="GET", route="/memos/{memo_id}", status="200") == before + 1
+    assert HTTP_REQUEST_DURATION.count(method="GET", route="unmatched", status="404") >= 1
+    # Arbitrary client-sent methods share one label
+    assert HTTP_REQUEST_DURATION.count(method="FOOBAR", route="/memos/{memo_id}", status="405") == 0
+    assert HTTP_REQUEST_DURATION.count(method="other", route="/memos/{memo_id}", status="405") >= 1
+
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert f'route="/memos/{{memo_id}}"' in response.text
+    assert f"/memos/{memo_id}\"" not in response.text
+
+
+@pytest.mark.asyncio
+async def test_metrics_exposes_pool_cache_and_event_stats(client: AsyncClient, fake_redis):
+    """Test that pool gauges, cache counters and event counters are exported"""
+    create_response = await client.post("/memos/", json={"title": "Metric", "content": "Body"})
+    memo_id = create_response.json()["id"]
+    await client.get(f"/memos/{memo_id}")
+    await client.get(f"/memos/{memo_id}")
+
+    text = (await client.get("/metrics")).text
+    assert "cache_hits_total 1" in text
+    assert "cache_misses_total 1" in text
+    assert 'redis_command_duration_seconds_count{operation="get"} ' in text
+    assert 'events_total{outcome="dropped"} 0' in text
+    assert "outbox_relayed_total 0" in text
+
+
+@pytest.mark.asyncio
+async def test_timed_pool_records_checkout_wait(client: AsyncClient, tmp_path, monkeypatch):
+    """Test that the instrumented pool observes every checkout and exports its gauges"""
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        poolclass=TimedAsyncAdaptedQueuePool,
+        pool_size=1,
+        max_overflow=0
+    )
+    before = DB_POOL_WAIT.count()
+    try:
+        for _ in range(2):
+            async with engine.connect() as conn:
+                await conn.execute(sqlalchemy.text("SELECT 1"))
+        assert DB_POOL_WAIT.count() == before + 2
+
+        monkeypatch.setattr(app.state, "db_engine", engine)
+        text = (await client.get("/metrics")).text
+        assert "db_pool_size 1" in text
+        assert "db_pool_checked_out 0" in text
+        assert "db_pool_checked_in 1" in text
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_metrics_are_hidden_from_proxied_requests(client: AsyncClient):
+    """Test that /metrics only answers direct requests from internal networks"""
+    assert (await client.get("/metrics")).status_code == 200
+    proxied = await client.get("/metrics", headers={"X-Forwarded-For": "203.0.113.9"})
+    assert proxied.status_code == 404
+
+    transport = ASGITransport(app=app, client=("203.0.113.9", 1234))
+    async with AsyncClient(transport=transport, base_url="http://test") as outside:
+        assert (await outside.get("/metrics")).status_code == 404
@@ -0,0 +1,34 @@
+import pytest
+import sqlalchemy
+from sqlalchemy.dialects import mysql
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.main import memo_tags, memos
+from app.migrations import schema_steps, upgrade_schema
+
+
+def test_steps_cover_columns_indexes_and_tags_added_since_release():
+    """Test that existing tables get the version column, every index and the tag backfill"""
+    steps = schema_steps(memos, memo_tags)
+    assert len({name for name, _ in steps}) == len(steps)
+
+    dialect = mysql.dialect(is_mariadb=True)
+    sql = {name: [str(statement.compile(dialect=dialect)) for statement in statements] for name, statements in steps}
+    assert "ADD COLUMN IF NOT EXISTS version" in sql["0001_memos_version"][0]
+    for index in memos.indexes:
+        assert any(f"CREATE INDEX IF NOT EXISTS {index.name} " in statement for statement in sql["0002_memos_list_indexes"])
+    assert "ADD FULLTEXT INDEX IF NOT EXISTS" in sql["0003_memos_fulltext"][0]
+    assert "COLLATE utf8mb4_bin" in sql["0004_memo_tags_binary_collation"][0]
+    backfill = sql["0005_memo_tags_backfill"][-1]
+    assert backfill.startswith("INSERT IGNORE INTO memo_tags") and "DISTINCT LOWER(TRIM(jt.tag))" in backfill
+
+
+@pytest.mark.asyncio
+async def test_upgrade_is_skipped_on_sqlite():
+    """Test that SQLite, whose tables always come complete from create_all, is left alone"""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        assert await upgrade_schema(conn, schema_steps(memos, memo_tags)) == []
+        tables = await conn.run_sync(lambda sync_conn: sqlalchemy.inspect(sync_conn).get_table_names())
+    await engine.dispose()
+    assert "schema_migrations" not in tables
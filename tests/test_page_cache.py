@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+from httpx import AsyncClient
+
+from app.main import MEMO_LIST_VERSION, app
+from app.page_cache import Page, PageCache
+from app.services import RedisService
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.page_cache.time.time", lambda: now[0])
+    return now
+
+
+def counting_loader(*bodies: bytes):
+    calls = []
+
+    async def load() -> Page:
+        calls.append(1)
+        await asyncio.sleep(0)
+        return Page(bodies[min(len(calls), len(bodies)) - 1], None)
+
+    return load, calls
+
+
+async def bump_list_version(cache: RedisService):
+    await cache.invalidate_tags(versions=[MEMO_LIST_VERSION])
+    return await cache.get_version(MEMO_LIST_VERSION)
+
+
+@pytest.mark.asyncio
+async def test_current_pages_are_never_reloaded(fake_redis, clock):
+    """Test that a page of the current list version is served until the hard TTL"""
+    cache = RedisService(fake_redis)
+    page_cache = PageCache(cache, soft_ttl=5, hard_ttl=60, counter=MEMO_LIST_VERSION)
+    load, calls = counting_loader(b"[1]", b"[1,2]")
+    version = await cache.get_version(MEMO_LIST_VERSION)
+
+    assert (await page_cache.get("page:a", version, load)) == Page(b"[1]", None, version)
+    clock[0] += 30
+    assert (await page_cache.get("page:a", version, load)).body == b"[1]"
+    assert len(calls) == 1 and not page_cache._tasks
+    assert fake_redis.ttls["page:a"] == 60
+    # Writes supersede pages through the version counter; no tag set tracks them
+    assert not any(key.startswith("tag:") for key in fake_redis.store)
+
+
+@pytest.mark.asyncio
+async def test_stale_while_revalidate_after_write(fake_redis, clock):
+    """Test that a write leaves the page in place, served stale while one task re-renders it"""
+    cache = RedisService(fake_redis)
+    page_cache = PageCache(cache, soft_ttl=5, hard_ttl=60, counter=MEMO_LIST_VERSION)
+    load, calls = counting_loader(b"[1]", b"[1,2]")
+    old = await cache.get_version(MEMO_LIST_VERSION)
+    await page_cache.get("page:a", old, load)
+
+    new = await bump_list_version(cache)
+    stale = await asyncio.gather(*(page_cache.get("page:a", new, load) for _ in range(3)))
+    assert stale == [Page(b"[1]", None, old)] * 3
+    await asyncio.gather(*page_cache._tasks)
+    assert len(calls) == 2
+    assert not any(key.startswith("lock:") for key in fake_redis.store)
+
+    refreshed, is_stale = await page_cache.read("page:a", new)
+    assert refreshed == Page(b"[1,2]", None, new) and not is_stale
+
+
+@pytest.mark.asyncio
+async def test_pages_behind_by_more_than_the_soft_ttl_are_reloaded(fake_redis, clock):
+    """Test that an outdated page rendered before the soft TTL is reloaded, not served"""
+    cache = RedisService(fake_redis)
+    page_cache = PageCache(cache, soft_ttl=5, hard_ttl=60, counter=MEMO_LIST_VERSION)
+    load, calls = counting_loader(b"[1]", b"[1,2]")
+    await page_cache.get("page:a", await cache.get_version(MEMO_LIST_VERSION), load)
+
+    new = await bump_list_version(cache)
+    clock[0] += 10
+    assert (await page_cache.get("page:a", new, load)).body == b"[1,2]"
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_pages_rendered_before_a_write_are_not_stored(fake_redis, clock):
+    """Test that a page loaded at an older version cannot overwrite a newer entry"""
+    cache = RedisService(fake_redis)
+    page_cache = PageCache(cache, soft_ttl=5, hard_ttl=60, counter=MEMO_LIST_VERSION)
+    old = await cache.get_version(MEMO_LIST_VERSION)
+    new = await bump_list_version(cache)
+
+    assert await page_cache.store("page:a", new, Page(b"[1,2]", None))
+    assert not await page_cache.store("page:a", old, Page(b"[1]", None))
+    assert (await page_cache.read("page:a", new))[0].body == b"[1,2]"
+
+
+@pytest.mark.asyncio
+async def test_failed_refresh_keeps_serving_stale(fake_redis, clock):
+    """Test that a refresh error leaves the stale page in place"""
+    cache = RedisService(fake_redis)
+    page_cache = PageCache(cache, soft_ttl=5, hard_ttl=60, counter=MEMO_LIST_VERSION)
+    old = await cache.get_version(MEMO_LIST_VERSION)
+    await page_cache.store("page:a", old, Page(b"[1]", None))
+    new = await bump_list_version(cache)
+
+    async def failing() -> Page:
+        raise RuntimeError("db down")
+
+    assert (await page_cache.get("page:a", new, failing)).body == b"[1]"
+    await asyncio.gather(*page_cache._tasks)
+    assert (await page_cache.read("page:a", new))[0].body == b"[1]"
+
+
+@pytest.mark.asyncio
+async def test_list_pages_are_cached_and_follow_writes(client: AsyncClient, fake_redis):
+    """Test that list and search pages come from the page cache and are re-rendered after a write"""
+    await client.post("/memos/", json={"title": "First", "content": "Body"})
+    first = await client.get("/memos/", params={"limit": 10})
+    await client.get("/memos/search/", params={"q": "Body"})
+    assert len([key for key in fake_redis.store if key.startswith("page:")]) == 2
+
+    second = await client.get("/memos/", params={"limit": 10})
+    assert second.content == first.content
+
+    await client.post("/memos/", json={"title": "Second", "content": "Body"})
+    assert (await client.get("/memos/", params={"limit": 10})).content == first.content
+    await asyncio.gather(*app.state.page_cache._tasks)
+    assert [memo["title"] for memo in (await client.get("/memos/", params={"limit": 10})).json()] == ["Second", "First"]
@@ -0,0 +1,83 @@
+import logging
+
+import pytest
+from httpx import AsyncClient
+
+import app.main as main
+from app.profiler import OTHER_FINGERPRINT, QueryProfiler, fingerprint
+
+
+def test_fingerprint_normalizes_literals_and_lists():
+    """Test that statements differing only in values share a fingerprint"""
+    first = fingerprint("SELECT * FROM memos WHERE id IN (1, 2, 3) AND title = 'a'  LIMIT 10")
+    second = fingerprint("SELECT * FROM memos WHERE id IN (7) AND title = 'it''s' LIMIT 50")
+    assert first == second == "SELECT * FROM memos WHERE id IN (...) AND title = ? LIMIT ?"
+
+    assert fingerprint("INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s), (%s, %s)") == \
+        "INSERT INTO t (a, b) VALUES (?, ?), ..."
+    assert fingerprint("SELECT ix_memos_updated_at_id FROM memos WHERE id = :id_1") == \
+        "SELECT ix_memos_updated_at_id FROM memos WHERE id = ?"
+
+
+def test_profiler_aggregates_and_logs_slow_queries(caplog):
+    """Test count, percentiles and the slow-query log"""
+    profiler = QueryProfiler(slow_threshold_ms=100)
+    for elapsed in (0.001, 0.002, 0.003, 0.004):
+        profiler.record("SELECT * FROM memos WHERE id = ?", elapsed, rows=1)
+    with caplog.at_level(logging.WARNING, logger="app.profiler"):
+        profiler.record("SELECT * FROM memos WHERE id = ?", 0.5, rows=1)
+
+    [report] = profiler.top()
+    assert report["count"] == 5
+    assert report["rows"] == 5
+    assert report["p50_ms"] == 3.0
+    assert report["p99_ms"] == 500.0
+    assert profiler.slow_queries == 1
+    assert "SELECT * FROM memos WHERE id = ?" in caplog.text
+
+
+def test_profiler_bounds_fingerprints():
+    """Test that distinct statements beyond the limit are folded into one bucket"""
+    profiler = QueryProfiler(max_fingerprints=2)
+    for table in ("a", "b", "c", "d"):
+        profiler.record(f"SELECT * FROM {table}", 0.001)
+    assert {report["fingerprint"] for report in profiler.top()} == {"SELECT * FROM a", "SELECT * FROM b", OTHER_FINGERPRINT}
+
+
+@pytest.mark.asyncio
+async def test_admin_queries_reports_statements(client: AsyncClient, monkeypatch):
+    """Test that statements run by the API show up in the admin report"""
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "secret")
+    admin = {"X-Admin-Token": "secret"}
+    await client.post("/memos/", json={"title": "Profiled", "content": "Body"})
+    for _ in range(3):
+        await client.get("/memos/")
+
+    response = await client.get("/admin/queries", params={"sort": "count"}, headers=admin)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["statements"] >= 4
+    assert any(q["fingerprint"].startswith("INSERT INTO memos") for q in data["queries"])
+    select = next(q for q in data["queries"] if q["fingerprint"].startswith("SELECT memos.id") and q["count"] == 3)
+    assert select["p50_ms"] <= select["p99_ms"]
+
+    assert (await client.delete("/admin/queries", headers=admin)).status_code == 204
+    assert (await client.get("/admin/queries", headers=admin)).json()["queries"] == []
+
+
+@pytest.mark.asyncio
+async def test_admin_queries_requires_token(client: AsyncClient, monkeypatch):
+    """Test that ADMIN_TOKEN protects the admin endpoints"""
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "secret")
+    assert (await client.get("/admin/queries")).status_code == 403
+    assert (await client.get("/admin/queries", headers={"X-Admin-Token": "wrong"})).status_code == 403
+    assert (await client.get("/admin/queries", headers={"X-Admin-Token": "secret"})).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_admin_queries_disabled_without_token(client: AsyncClient, monkeypatch):
+    """Test that the admin endpoints fail closed while ADMIN_TOKEN is unset"""
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "")
+    assert (await client.get("/admin/queries")).status_code == 404
+    assert (await client.get("/admin/queries", headers={"X-Admin-Token": ""})).status_code == 404
+    assert (await client.delete("/admin/queries")).status_code == 404
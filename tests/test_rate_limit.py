@@ -0,0 +1,171 @@
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.main import RATE_LIMIT_RULES, app
+from app.metrics import RATE_LIMIT_BACKEND_ERRORS, RATE_LIMITED_REQUESTS
+from app.rate_limit import (
+    LocalTokenBuckets,
+    RateLimiter,
+    Rule,
+    RateLimitMiddleware,
+    client_address,
+    internal_caller,
+    parse_networks,
+    parse_rules,
+    request_cost,
+    rule_for,
+)
+
+
+@pytest.fixture
+def limiter(client, monkeypatch):
+    """A strict limiter without Redis: 2 requests per client, 1 per search client"""
+    rate_limiter = RateLimiter(None, Rule("client", 0.5, 2), parse_rules("/memos/search=0.1/1"))
+    monkeypatch.setattr(app.state, "rate_limiter", rate_limiter)
+    return rate_limiter
+
+
+def test_local_bucket_refills_at_rate(monkeypatch):
+    """Test burst, refill and that a rejected request takes no tokens"""
+    now = [100.0]
+    monkeypatch.setattr("app.rate_limit.time.monotonic", lambda: now[0])
+    buckets = LocalTokenBuckets()
+    rule = Rule("client", 2.0, 3)
+
+    assert [buckets.acquire([("a", rule)], 1)[0] for _ in range(4)] == [0, 0, 0, 1]
+    limiting, retry_after, remaining = buckets.acquire([("a", rule)], 1)
+    assert limiting == 1 and retry_after == pytest.approx(0.5)
+    now[0] += 0.5
+    assert buckets.acquire([("a", rule)], 1)[0] == 0
+    # Costs above the burst are capped instead of never fitting
+    now[0] += 10
+    assert buckets.acquire([("a", rule)], 50)[0] == 0
+
+
+def test_request_identity_and_cost():
+    """Test client address behind trusted proxies and offset-based cost"""
+    scope = {"client": ("10.0.0.5", 1234), "headers": [(b"x-forwarded-for", b"203.0.113.9, 10.0.0.1")]}
+    proxies = parse_networks("10.0.0.0/8")
+    assert client_address(scope) == "10.0.0.5"
+    assert client_address(scope, trusted_hops=1, trusted_proxies=proxies) == "10.0.0.1"
+    assert client_address(scope, trusted_hops=2, trusted_proxies=proxies) == "203.0.113.9"
+    # X-Forwarded-For sent by a peer that is not one of our proxies is ignored
+    direct = {"client": ("198.51.100.3", 1234), "headers": scope["headers"]}
+    assert client_address(direct, trusted_hops=1, trusted_proxies=proxies) == "198.51.100.3"
+    assert client_address(scope, trusted_hops=1) == "10.0.0.5"
+    assert request_cost(b"skip=2500&limit=10", 1000) == 3
+    assert request_cost(b"skip=abc", 1000) == 1
+    assert request_cost(b"skip=2500", 0) == 1
+
+    internal = parse_networks("10.0.0.0/8, 172.16.0.0/12")
+    assert not internal_caller(scope, internal)
+    assert internal_caller({"client": ("172.18.0.4", 1234), "headers": []}, internal)
+    assert not internal_caller({"client": ("203.0.113.9", 1234), "headers": []}, internal)
+    assert not internal_caller({"client": ("172.18.0.4", 1234), "headers": []}, [])
+
+
+def test_export_has_a_strict_default_rule():
+    """Test that whole-table exports are limited well below ordinary reads"""
+    export = rule_for("/memos/export", RATE_LIMIT_RULES)
+    assert export is not None and export.name == "/memos/export"
+    assert export.rate < 0.1 and export.burst <= 2
+
+
+@pytest.mark.asyncio
+async def test_clients_behind_proxy_get_own_buckets():
+    """Test one bucket per forwarded client behind nginx, and unlimited SSR calls"""
+    proxied = FastAPI()
+    proxied.state.rate_limiter = RateLimiter(None, Rule("client", 0.1, 1))
+    private = parse_networks("172.16.0.0/12")
+    proxied.add_middleware(RateLimitMiddleware, trusted_hops=1, internal_networks=private, trusted_proxies=private)
+
+    @proxied.get("/memos/")
+    async def memos():
+        return []
+
+    # nginx (172.18.0.5) appends $remote_addr to whatever the client sent
+    nginx = ASGITransport(app=proxied, client=("172.18.0.5", 40000))
+    async with AsyncClient(transport=nginx, base_url="http://test") as through_proxy:
+        first = {"X-Forwarded-For": "198.51.100.1"}
+        spoofed = {"X-Forwarded-For": "198.51.100.7, 198.51.100.1"}
+        second = {"X-Forwarded-For": "198.51.100.2"}
+        assert (await through_proxy.get("/memos/", headers=first)).status_code == 200
+        assert (await through_proxy.get("/memos/", headers=spoofed)).status_code == 429
+        assert (await through_proxy.get("/memos/", headers=second)).status_code == 200
+
+    # A client reaching the published port directly cannot pick a new bucket per request
+    direct = ASGITransport(app=proxied, client=("203.0.113.50", 40000))
+    async with AsyncClient(transport=direct, base_url="http://test") as bypass:
+        assert (await bypass.get("/memos/", headers={"X-Forwarded-For": "192.0.2.1"})).status_code == 200
+        assert (await bypass.get("/memos/", headers={"X-Forwarded-For": "192.0.2.2"})).status_code == 429
+
+    # The frontend server (SSR) calls the app directly, without X-Forwarded-For
+    frontend = ASGITransport(app=proxied, client=("172.18.0.6", 40000))
+    async with AsyncClient(transport=frontend, base_url="http://test") as ssr:
+        statuses = {(await ssr.get("/memos/")).status_code for _ in range(5)}
+    assert statuses == {200}
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_requests_get_429(client: AsyncClient, limiter):
+    """Test 429 with Retry-After per route bucket, client bucket and exemptions"""
+    rejected = RATE_LIMITED_REQUESTS.value(rule="/memos/search", backend="local")
+
+    assert (await client.get("/memos/search/", params={"q": "a"})).status_code == 200
+    response = await client.get("/memos/search/", params={"q": "a"})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "10"
+    assert RATE_LIMITED_REQUESTS.value(rule="/memos/search", backend="local") == rejected + 1
+
+    # The rejected search took nothing from the client bucket: one request left
+    assert (await client.get("/memos/")).status_code == 200
+    assert (await client.get("/memos/")).status_code == 429
+
+    assert (await client.get("/health")).status_code == 200
+    assert (await client.get("/metrics")).status_code == 200
+
+
+class FailingScriptRedis:
+    def register_script(self, script):
+        async def run(keys, args):
+            raise ConnectionError("redis down")
+        return run
+
+
+class RecordingScriptRedis:
+    def __init__(self):
+        self.calls = []
+
+    def register_script(self, script):
+        async def run(keys, args):
+            self.calls.append((keys, args))
+            return [0, "0", "4"]
+        return run
+
+
+@pytest.mark.asyncio
+async def test_redis_buckets_in_one_script_call():
+    """Test that both buckets go to Redis in a single script call"""
+    redis_client = RecordingScriptRedis()
+    rate_limiter = RateLimiter(redis_client, Rule("client", 10, 20), parse_rules("/memos/search=1/5"))
+
+    decision = await rate_limiter.acquire("10.0.0.5", "/memos/search", cost=2)
+
+    assert decision.allowed and decision.remaining == 4
+    assert redis_client.calls == [(
+        ["ratelimit:10.0.0.5", "ratelimit:10.0.0.5:/memos/search"],
+        [2, 10, 20, 1, 5]
+    )]
+
+
+@pytest.mark.asyncio
+async def test_redis_failure_falls_back_to_local_buckets():
+    """Test that limits keep holding with local buckets while Redis fails"""
+    errors = RATE_LIMIT_BACKEND_ERRORS.value()
+    rate_limiter = RateLimiter(FailingScriptRedis(), Rule("client", 0.1, 1))
+
+    assert (await rate_limiter.acquire("c", "/memos/")).allowed
+    decision = await rate_limiter.acquire("c", "/memos/")
+    assert not decision.allowed and decision.rule == "client"
+    assert RATE_LIMIT_BACKEND_ERRORS.value() == errors + 2
@@ -0,0 +1,54 @@
+import pytest
+from sqlalchemy.dialects import mysql
+
+from app.main import memos
+from app.search import fulltext_terms, search_criteria, highlight_snippet
+
+
+def compile_mysql(clause) -> str:
+    return str(clause.compile(dialect=mysql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def test_fulltext_terms_strip_boolean_operators():
+    """Test that user input cannot inject boolean-mode operators"""
+    assert fulltext_terms('+검색을 -"fast api"* (docker)') == ["검색을", "fast", "api", "docker"]
+
+
+def test_search_criteria_uses_match_on_mysql():
+    """Test that MariaDB searches go through MATCH ... AGAINST with prefix terms"""
+    criteria, score = search_criteria(memos.c.title, memos.c.content, "검색 fastapi", "mysql")
+
+    assert score is not None
+    sql = compile_mysql(criteria)
+    assert "MATCH (memos.title, memos.content) AGAINST ('+검색* +fastapi*' IN BOOLEAN MODE)" in sql
+    assert "LIKE" not in sql
+
+
+def test_search_criteria_checks_short_terms_with_like():
+    """Test that terms below the index token size are still required"""
+    criteria, score = search_criteria(memos.c.title, memos.c.content, "python 3", "mysql")
+
+    sql = compile_mysql(criteria)
+    assert "AGAINST ('+python*' IN BOOLEAN MODE)" in sql
+    assert "LIKE '%%3%%'" in sql
+
+
+@pytest.mark.parametrize("dialect_name, q", [("sqlite", "python"), ("mysql", "a")])
+def test_search_criteria_falls_back_to_like(dialect_name, q):
+    """Test the LIKE path for non-MariaDB dialects and unindexable queries"""
+    criteria, score = search_criteria(memos.c.title, memos.c.content, q, dialect_name)
+
+    assert score is None
+    assert "LIKE" in compile_mysql(criteria)
+
+
+def test_highlight_snippet_windows_long_text():
+    """Test that the snippet is cut around the first match"""
+    text = "a" * 500 + " kafka consumer " + "b" * 500
+
+    snippet = highlight_snippet(text, "Kafka", length=60)
+
+    assert snippet.startswith("…")
+    assert snippet.endswith("…")
+    assert "<mark>kafka</mark>" in snippet
+    assert len(snippet) < 100
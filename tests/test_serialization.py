@@ -0,0 +1,46 @@
+import json
+from datetime import datetime
+
+import pytest
+from httpx import AsyncClient
+
+from app import serialization
+from app.main import MemoInDB, MEMO_FIELDS, memos
+
+
+def pydantic_body(rows) -> bytes:
+    """Body FastAPI renders for a List[MemoInDB] response_model"""
+    items = [MemoInDB.model_validate(row).model_dump(mode="json") for row in rows]
+    return json.dumps(items, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def test_render_rows_matches_response_model():
+    """Test that the fast path produces the same bytes as the response_model path"""
+    rows = [
+        {
+            "id": 1, "title": "메모 \"1\"", "content": "내용\n줄바꿈", "tags": ["a", "한글"], "priority": 3,
+            "category": None, "is_archived": False, "is_favorite": True, "author": "작성자",
+            "created_at": datetime(2026, 1, 2, 3, 4, 5), "updated_at": datetime(2026, 1, 2, 3, 4, 5, 120000),
+            "version": 3,
+        },
+        {
+            "id": 2, "title": "t", "content": "c", "tags": None, "priority": 2,
+            "category": "dev", "is_archived": True, "is_favorite": False, "author": None,
+            "created_at": datetime(2026, 1, 2), "updated_at": datetime(2026, 1, 2), "version": 1,
+        },
+    ]
+
+    assert serialization.render_rows(rows, MEMO_FIELDS) == pydantic_body(rows)
+
+
+@pytest.mark.asyncio
+async def test_memo_list_wire_format(client: AsyncClient, test_db):
+    """Test that /memos/ returns exactly what the response_model would render"""
+    for i in range(3):
+        await client.post("/memos/", json={"title": f"제목 {i}", "content": "본문", "tags": ["x"]})
+
+    response = await client.get("/memos/")
+
+    rows = (await test_db.execute(memos.select().order_by(memos.c.id.desc()))).mappings().all()
+    assert response.headers["content-type"] == "application/json"
+    assert response.content == pydantic_body(rows)
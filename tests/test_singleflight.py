@@ -0,0 +1,127 @@
+import asyncio
+import json
+
+import pytest
+from httpx import AsyncClient
+
+from app.services import RedisService
+from app.singleflight import SingleFlight, fill_once
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_load():
+    """Test that identical concurrent calls run the load once and get its result"""
+    flights = SingleFlight()
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"id": 1}
+
+    results = await asyncio.gather(*(flights.do(("memo", 1), load) for _ in range(5)))
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert flights.in_flight() == 0
+    await flights.do(("memo", 1), load)
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_errors_and_cancellation():
+    """Test that errors reach every caller and a cancelled leader does not cancel the load"""
+    flights = SingleFlight()
+    release = asyncio.Event()
+
+    async def failing():
+        await release.wait()
+        raise ValueError("db down")
+
+    callers = [asyncio.create_task(flights.do(("list", "/memos/"), failing)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+    for caller in callers:
+        with pytest.raises(ValueError):
+            await caller
+
+    async def slow():
+        await asyncio.sleep(0.01)
+        return "page"
+
+    leader = asyncio.create_task(flights.do(("list", "/memos/"), slow))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flights.do(("list", "/memos/"), slow))
+    await asyncio.sleep(0)
+    leader.cancel()
+    assert await follower == "page"
+
+
+@pytest.mark.asyncio
+async def test_forget_starts_a_new_load():
+    """Test that calls after forget_group do not join loads begun before a write"""
+    flights = SingleFlight()
+    versions = iter(["before", "after"])
+
+    async def load():
+        value = next(versions)
+        await asyncio.sleep(0.01)
+        return value
+
+    first = asyncio.create_task(flights.do(("list", "/memos/"), load))
+    await asyncio.sleep(0)
+    flights.forget_group("list")
+    second = asyncio.create_task(flights.do(("list", "/memos/"), load))
+
+    assert await first == "before"
+    assert await second == "after"
+
+
+@pytest.mark.asyncio
+async def test_fill_once_waits_for_other_replica(fake_redis):
+    """Test that a replica finding the fill lock taken reads the entry the holder stores"""
+    cache = RedisService(fake_redis)
+    await fake_redis.set("lock:memo:1", "other-replica", nx=True, px=500)
+    loads = []
+
+    async def load():
+        loads.append(1)
+        return {"id": 1, "source": "db"}
+
+    async def fill_later():
+        await asyncio.sleep(0.03)
+        fake_redis.store["memo:1"] = json.dumps({"id": 1, "source": "cache"})
+
+    filler = asyncio.create_task(fill_later())
+    value = await fill_once(cache, "memo:1", 0.5, lambda: cache.get_cache("memo:1"), load, poll_interval=0.01)
+    await filler
+
+    assert value == {"id": 1, "source": "cache"}
+    assert loads == []
+
+    # The holder released the lock without an entry (e.g. the memo does not exist): load
+    await fake_redis.delete("memo:1")
+
+    async def release_later():
+        await asyncio.sleep(0.03)
+        await fake_redis.delete("lock:memo:1")
+
+    releaser = asyncio.create_task(release_later())
+    value = await fill_once(cache, "memo:1", 5, lambda: cache.get_cache("memo:1"), load, poll_interval=0.01)
+    await releaser
+    assert value == {"id": 1, "source": "db"}
+    assert loads == [1]
+
+
+@pytest.mark.asyncio
+async def test_read_after_write_is_not_coalesced_with_older_read(client: AsyncClient, fake_redis):
+    """Test that memo reads go through the fill path and writes are visible right away"""
+    memo = (await client.post("/memos/", json={"title": "Flight", "content": "v1"})).json()
+
+    responses = await asyncio.gather(*(client.get(f"/memos/{memo['id']}") for _ in range(3)))
+    assert {response.json()["content"] for response in responses} == {"v1"}
+    assert not any(key.startswith("lock:") for key in fake_redis.store)
+
+    await client.put(f"/memos/{memo['id']}", json={"content": "v2"})
+    assert (await client.get(f"/memos/{memo['id']}")).json()["content"] == "v2"
+    assert (await client.get("/memos/999999")).status_code == 404
@@ -0,0 +1,82 @@
+import pytest
+from httpx import AsyncClient
+
+from app.main import app
+from app.stats import STATS_META_KEY, row_deltas, stats_key
+
+
+def test_row_deltas_net_out_unchanged_values():
+    """Test that only dimensions whose value changed produce counter deltas"""
+    old = {"category": "study", "priority": 2, "is_archived": False, "is_favorite": False, "author": None}
+    new = {**old, "category": "club", "is_archived": True}
+    deltas, total = row_deltas([(old, new)])
+    assert total == 0
+    assert dict(deltas) == {
+        ("category", "study"): -1,
+        ("category", "club"): 1,
+        ("is_archived", "false"): -1,
+        ("is_archived", "true"): 1,
+    }
+
+
+async def seed(client: AsyncClient):
+    await client.post("/memos/bulk", json=[
+        {"title": "A", "content": "Body", "category": "study", "priority": 3, "author": "kim"},
+        {"title": "B", "content": "Body", "category": "study", "is_favorite": True},
+        {"title": "C", "content": "Body", "category": "club", "is_archived": True, "author": "kim"},
+    ])
+
+
+@pytest.mark.asyncio
+async def test_stats_without_redis_uses_group_by(client: AsyncClient):
+    """Test the GROUP BY fallback when Redis is unavailable"""
+    await seed(client)
+    response = await client.get("/memos/stats")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["source"] == "database"
+    assert data["total"] == 3
+    assert data["category"] == {"study": 2, "club": 1}
+    assert data["priority"] == {"2": 2, "3": 1}
+    assert data["is_archived"] == {"false": 2, "true": 1}
+    assert data["author"] == {"kim": 2, "": 1}
+
+
+@pytest.mark.asyncio
+async def test_stats_counters_follow_writes(client: AsyncClient, fake_redis):
+    """Test that creates, updates and deletes adjust the Redis counters by delta"""
+    await seed(client)
+    first = (await client.get("/memos/stats")).json()
+    assert first["source"] == "redis"
+    assert first["category"] == {"study": 2, "club": 1}
+
+    created = (await client.post("/memos/", json={"title": "D", "content": "Body", "category": "club"})).json()
+    await client.put(f"/memos/{created['id']}", json={"category": "study", "is_favorite": True})
+    # Updates outside the counted columns do not touch the counters
+    await client.put(f"/memos/{created['id']}", json={"title": "D2"})
+    await client.delete("/memos/1")
+
+    data = (await client.get("/memos/stats")).json()
+    assert data["total"] == 3
+    assert data["category"] == {"study": 2, "club": 1}
+    assert data["is_favorite"] == {"true": 2, "false": 1}
+    assert data["priority"] == {"2": 3}
+    assert data["author"] == {"": 2, "kim": 1}
+
+    # Served from the hashes alone: the counters are what was read
+    assert fake_redis.store[stats_key("category")]["study"] == "2"
+
+
+@pytest.mark.asyncio
+async def test_stats_rebuild_repairs_drift(client: AsyncClient, fake_redis):
+    """Test that reconciliation replaces drifted counters with the table's counts"""
+    await seed(client)
+    await client.get("/memos/stats")
+    await fake_redis.hincrby(stats_key("category"), "study", 40)
+    await fake_redis.hincrby(stats_key("category"), "ghost", 1)
+    assert (await client.get("/memos/stats")).json()["category"]["study"] == 42
+
+    await app.state.memo_stats.rebuild()
+    data = (await client.get("/memos/stats")).json()
+    assert data["category"] == {"study": 2, "club": 1}
+    assert fake_redis.store[STATS_META_KEY]["total"] == "3"
@@ -0,0 +1,105 @@
+import pytest
+import sqlalchemy
+from httpx import AsyncClient
+
+from app.main import memo_tags, memos, tag_criteria
+
+
+async def create_tagged(client: AsyncClient):
+    response = await client.post("/memos/bulk", json=[
+        {"title": "A", "content": "Body", "tags": ["python", "fastapi"]},
+        {"title": "B", "content": "Body", "tags": ["python"]},
+        {"title": "C", "content": "Body", "tags": ["svelte", "fastapi", "fastapi"]},
+    ])
+    return response.json()["ids"]
+
+
+@pytest.mark.asyncio
+async def test_filter_by_tags_all_and_any(client: AsyncClient):
+    """Test ?tag= with AND (default) and OR semantics"""
+    await create_tagged(client)
+
+    response = await client.get("/memos/", params={"tag": ["python", "fastapi"]})
+    assert [memo["title"] for memo in response.json()] == ["A"]
+
+    response = await client.get("/memos/", params={"tag": ["python", "svelte"], "tag_mode": "any"})
+    assert [memo["title"] for memo in response.json()] == ["C", "B", "A"]
+
+    response = await client.get("/memos/", params={"tag": "fastapi", "limit": 1})
+    assert [memo["title"] for memo in response.json()] == ["C"]
+    cursor = response.headers["X-Next-Cursor"]
+    response = await client.get("/memos/", params={"tag": "fastapi", "limit": 1, "cursor": cursor})
+    assert [memo["title"] for memo in response.json()] == ["A"]
+
+
+@pytest.mark.asyncio
+async def test_tags_differing_only_in_case_are_one_tag(client: AsyncClient):
+    """Test that tags are matched case-insensitively and indexed once per memo"""
+    response = await client.post("/memos/", json={"title": "Mixed", "content": "Body", "tags": ["Python", "python"]})
+    assert response.status_code == 201
+    assert response.json()["tags"] == ["Python", "python"]
+    response = await client.post("/memos/bulk", json=[
+        {"title": "Bulk", "content": "Body", "tags": ["PYTHON", "FastAPI", "fastapi"]},
+    ])
+    assert response.status_code == 201
+
+    response = await client.get("/memos/", params={"tag": ["Python", "python"]})
+    assert [memo["title"] for memo in response.json()] == ["Bulk", "Mixed"]
+    response = await client.get("/memos/", params={"tag": ["pyTHON", "fastapi"]})
+    assert [memo["title"] for memo in response.json()] == ["Bulk"]
+    assert (await client.get("/tags", params={"prefix": "Py"})).json() == [{"tag": "python", "count": 2}]
+
+
+@pytest.mark.asyncio
+async def test_tag_index_follows_updates_and_deletes(client: AsyncClient):
+    """Test that memo_tags is kept in sync by create, update and delete"""
+    response = await client.post("/memos/", json={"title": "Tagged", "content": "Body", "tags": [" draft ", "todo"]})
+    memo = response.json()
+    assert memo["tags"] == ["draft", "todo"]
+    assert len((await client.get("/memos/", params={"tag": "draft"})).json()) == 1
+
+    await client.put(f"/memos/{memo['id']}", json={"tags": ["done"]})
+    assert (await client.get("/memos/", params={"tag": "draft"})).json() == []
+    assert len((await client.get("/memos/", params={"tag": "done"})).json()) == 1
+
+    # Updates that leave tags alone keep the index as it is
+    await client.put(f"/memos/{memo['id']}", json={"title": "Renamed"})
+    assert len((await client.get("/memos/", params={"tag": "done"})).json()) == 1
+
+    assert (await client.delete(f"/memos/{memo['id']}")).status_code == 204
+    assert (await client.get("/tags")).json() == []
+
+
+@pytest.mark.asyncio
+async def test_read_tags_counts(client: AsyncClient):
+    """Test tag facets with counts, ordering and prefix lookup"""
+    await create_tagged(client)
+
+    response = await client.get("/tags")
+    assert response.json() == [
+        {"tag": "fastapi", "count": 2},
+        {"tag": "python", "count": 2},
+        {"tag": "svelte", "count": 1},
+    ]
+    response = await client.get("/tags", params={"prefix": "py"})
+    assert response.json() == [{"tag": "python", "count": 2}]
+    assert (await client.get("/tags", params={"prefix": "%"})).json() == []
+
+
+@pytest.mark.asyncio
+async def test_tag_lookup_uses_primary_key(test_engine):
+    """Test that tag lookups and counts read the memo_tags primary key, not the JSON column"""
+    tagged = memos.select().where(tag_criteria(["python", "fastapi"], "all")).order_by(memos.c.id.desc()).limit(20)
+    counts = sqlalchemy.select(memo_tags.c.tag, sqlalchemy.func.count()).group_by(memo_tags.c.tag)
+    async with test_engine.connect() as conn:
+        async def plan(query):
+            sql = str(query.compile(test_engine.sync_engine, compile_kwargs={"literal_binds": True}))
+            return " ".join(row[-1] for row in await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"))
+
+        # Tag lookups seek into the (tag, memo_id) key
+        tagged_plan = await plan(tagged)
+        assert "SEARCH memo_tags USING COVERING INDEX sqlite_autoindex_memo_tags_1 (tag=?)" in tagged_plan, tagged_plan
+        # Counts walk the key in tag order: index-only, no temporary table for the GROUP BY
+        counts_plan = await plan(counts)
+        assert "USING COVERING INDEX sqlite_autoindex_memo_tags_1" in counts_plan, counts_plan
+        assert "TEMP B-TREE" not in counts_plan, counts_plan